@@ -0,0 +1 @@
+"""Shared building blocks for the Digital Clone pages and ingestion code."""
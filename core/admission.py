@@ -0,0 +1,228 @@
+"""Admission control in front of LLM generation.
+
+Each generation needs a slot under both the global and the per-creator
+concurrency limit and, when token-rate limits are set, enough tokens in the
+global and per-creator buckets (a reservation of prompt + MAX_GEN_LEN,
+refunded down to the estimated actual use on release). Requests that can't
+start wait in a per-creator FIFO. Creators take turns by start-time fair
+queueing weighted by ADMISSION_CREATOR_WEIGHTS, so a creator with a deep
+backlog can't push a small creator's single request to the back of the line.
+Requests beyond the queue limits or ADMISSION_MAX_WAIT_SECONDS are shed with
+Overloaded.
+
+Limits are per process: with several Streamlit processes, divide the Bedrock
+quota by the process count.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "16"))
+ADMISSION_CREATOR_CONCURRENCY = int(os.getenv("ADMISSION_CREATOR_CONCURRENCY", "4"))
+ADMISSION_TOKENS_PER_MINUTE = int(os.getenv("ADMISSION_TOKENS_PER_MINUTE", "0"))  # 0 = unlimited
+ADMISSION_CREATOR_TOKENS_PER_MINUTE = int(os.getenv("ADMISSION_CREATOR_TOKENS_PER_MINUTE", "0"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "200"))
+ADMISSION_CREATOR_MAX_QUEUE = int(os.getenv("ADMISSION_CREATOR_MAX_QUEUE", "50"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "30"))
+ADMISSION_SHED_MESSAGE = os.getenv(
+    "ADMISSION_SHED_MESSAGE",
+    "I'm getting a lot of questions right now and can't answer this one. Please try again in a minute."
+)
+
+
+def parse_weights(value):
+    """Parse "alice:2,bob:0.5" into {"alice": 2.0, "bob": 0.5}."""
+    weights = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        creator, _, weight = item.partition(":")
+        weights[creator.strip()] = float(weight)
+    return weights
+
+
+ADMISSION_CREATOR_WEIGHTS = parse_weights(os.getenv("ADMISSION_CREATOR_WEIGHTS", ""))
+
+
+class Overloaded(Exception):
+    """The request was shed instead of queued (queue full or waited too long)."""
+
+
+class TokenBucket:
+    """Tokens per minute with up to one minute of burst; rate 0 never limits."""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def allows(self, cost):
+        if not self.capacity:
+            return True
+        self._refill()
+        # A request larger than the bucket runs once the bucket is full
+        return self.tokens >= min(cost, self.capacity)
+
+    def take(self, cost):
+        if self.capacity:
+            self.tokens -= min(cost, self.capacity)
+
+    def refund(self, tokens):
+        if self.capacity and tokens > 0:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + tokens)
+
+
+class Ticket:
+    def __init__(self, creator, cost):
+        self.creator = creator
+        self.cost = cost
+        self.enqueued = time.monotonic()
+        self.admitted = False
+        self.waited = 0.0
+
+
+class AdmissionController:
+    def __init__(self, max_concurrency=ADMISSION_MAX_CONCURRENCY, creator_concurrency=ADMISSION_CREATOR_CONCURRENCY,
+                 tokens_per_minute=ADMISSION_TOKENS_PER_MINUTE,
+                 creator_tokens_per_minute=ADMISSION_CREATOR_TOKENS_PER_MINUTE, max_queue=ADMISSION_MAX_QUEUE,
+                 creator_max_queue=ADMISSION_CREATOR_MAX_QUEUE, max_wait=ADMISSION_MAX_WAIT_SECONDS, weights=None):
+        self.max_concurrency = max_concurrency
+        self.creator_concurrency = creator_concurrency
+        self.creator_tokens_per_minute = creator_tokens_per_minute
+        self.max_queue = max_queue
+        self.creator_max_queue = creator_max_queue
+        self.max_wait = max_wait
+        self.weights = dict(ADMISSION_CREATOR_WEIGHTS if weights is None else weights)
+        self._cond = threading.Condition()
+        self._bucket = TokenBucket(tokens_per_minute)
+        self._creator_buckets = {}
+        self._queues = {}  # creator -> deque of waiting tickets
+        self._active = {}  # creator -> running generations
+        self._finish = {}  # creator -> virtual finish tag of its last admitted request
+        self._vclock = 0.0
+        self.running = 0
+        self.admitted = 0
+        self.shed = 0
+
+    def _creator_bucket(self, creator):
+        if creator not in self._creator_buckets:
+            self._creator_buckets[creator] = TokenBucket(self.creator_tokens_per_minute)
+        return self._creator_buckets[creator]
+
+    def _dispatch(self):
+        """Admit waiting heads while capacity lasts, smallest start tag first."""
+        while self.running < self.max_concurrency:
+            best = None
+            for creator, queue in self._queues.items():
+                if not queue or self._active.get(creator, 0) >= self.creator_concurrency:
+                    continue
+                head = queue[0]
+                if not (self._bucket.allows(head.cost) and self._creator_bucket(creator).allows(head.cost)):
+                    continue
+                start = max(self._finish.get(creator, 0.0), self._vclock)
+                if best is None or (start, head.enqueued) < (best[0], best[1].enqueued):
+                    best = (start, head)
+            if best is None:
+                return
+            start, ticket = best
+            self._queues[ticket.creator].popleft()
+            self._vclock = start
+            self._finish[ticket.creator] = start + ticket.cost / self.weights.get(ticket.creator, 1.0)
+            self._bucket.take(ticket.cost)
+            self._creator_bucket(ticket.creator).take(ticket.cost)
+            self._active[ticket.creator] = self._active.get(ticket.creator, 0) + 1
+            self.running += 1
+            self.admitted += 1
+            ticket.admitted = True
+            ticket.waited = time.monotonic() - ticket.enqueued
+
+    def acquire(self, creator, cost, on_wait=None):
+        """Block until the request may call the model and return its ticket.
+
+        While queued, `on_wait(position)` is called about twice a second with
+        the number of this creator's requests ahead plus one, and once with
+        None when the request is admitted. Raises Overloaded if the request
+        is shed.
+        """
+        ticket = Ticket(creator, cost)
+        deadline = ticket.enqueued + self.max_wait
+        with self._cond:
+            queue = self._queues.setdefault(creator, deque())
+            if sum(len(q) for q in self._queues.values()) >= self.max_queue or len(queue) >= self.creator_max_queue:
+                self.shed += 1
+                raise Overloaded(f"Admission queue full for {creator}")
+            queue.append(ticket)
+        queued = False
+        try:
+            while True:
+                with self._cond:
+                    self._dispatch()
+                    if ticket.admitted:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._queues[creator].remove(ticket)
+                        self.shed += 1
+                        self._dispatch()
+                        self._cond.notify_all()
+                        raise Overloaded(f"Waited {self.max_wait:.0f}s for a generation slot")
+                    position = self._queues[creator].index(ticket) + 1
+                # Report outside the lock; the callback may be slow (e.g. a UI update)
+                if on_wait is not None:
+                    queued = True
+                    on_wait(position)
+                with self._cond:
+                    if not ticket.admitted:
+                        self._cond.wait(timeout=min(0.5, remaining))
+            if queued and on_wait is not None:
+                on_wait(None)
+        except BaseException:
+            # Interrupted (e.g. Streamlit's rerun raised from on_wait): don't
+            # leave the ticket queued or holding a slot nobody will release
+            with self._cond:
+                admitted = ticket.admitted
+                if not admitted and ticket in self._queues[creator]:
+                    self._queues[creator].remove(ticket)
+                    self._dispatch()
+                    self._cond.notify_all()
+            if admitted:
+                self.release(ticket, used_tokens=0)
+            raise
+        return ticket
+
+    def release(self, ticket, used_tokens=None):
+        """Free the ticket's slot and refund the unused part of its token reservation."""
+        with self._cond:
+            self.running -= 1
+            self._active[ticket.creator] -= 1
+            if used_tokens is not None:
+                self._bucket.refund(ticket.cost - used_tokens)
+                self._creator_bucket(ticket.creator).refund(ticket.cost - used_tokens)
+            self._dispatch()
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "running": self.running,
+                "queued": sum(len(q) for q in self._queues.values()),
+                "admitted": self.admitted,
+                "shed": self.shed,
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller():
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController()
+        return _controller
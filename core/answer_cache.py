@@ -0,0 +1,151 @@
+"""Per-creator semantic cache of generated answers.
+
+A new question whose embedding is within `threshold` cosine similarity of a
+cached question, asked in the same conversation context (see
+core.chat_pipeline.context_hash), gets the stored answer back without
+retrieval or generation. Follow-ups like "tell me more" therefore only reuse
+answers given after the same earlier turns.
+Entries expire after `ttl` seconds, each creator keeps at most `max_entries`
+(least recently hit are evicted first), and the whole creator cache is dropped
+when their content or profile changes.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "data/cache/answers.sqlite")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "500"))
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class AnswerCache:
+    def __init__(self, path=ANSWER_CACHE_PATH, threshold=ANSWER_CACHE_THRESHOLD,
+                 ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # creator -> (generation, row ids, created_at array, context array, unit vector matrix)
+        self._loaded = {}
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                creator TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                last_hit REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS answers_creator ON answers (creator);
+            CREATE TABLE IF NOT EXISTS generations (
+                creator TEXT PRIMARY KEY,
+                generation INTEGER NOT NULL
+            );
+        """)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(answers)")]
+        if "context" not in columns:
+            # Entries cached before contexts were recorded never match again
+            self._db.execute("ALTER TABLE answers ADD COLUMN context TEXT NOT NULL DEFAULT ''")
+
+    def _generation(self, creator):
+        row = self._db.execute("SELECT generation FROM generations WHERE creator = ?", (creator,)).fetchone()
+        return row[0] if row else 0
+
+    def _bump(self, creator):
+        # Every write bumps the generation so other processes reload their matrix
+        self._db.execute(
+            "INSERT INTO generations (creator, generation) VALUES (?, 1) "
+            "ON CONFLICT(creator) DO UPDATE SET generation = generation + 1",
+            (creator,)
+        )
+
+    def _matrix(self, creator):
+        generation = self._generation(creator)
+        loaded = self._loaded.get(creator)
+        if loaded is None or loaded[0] != generation:
+            rows = self._db.execute(
+                "SELECT id, created_at, context, vector FROM answers WHERE creator = ?", (creator,)
+            ).fetchall()
+            ids = [row[0] for row in rows]
+            created = np.array([row[1] for row in rows], dtype=np.float64)
+            contexts = np.array([row[2] for row in rows], dtype=object)
+            if rows:
+                matrix = np.stack([np.frombuffer(row[3], dtype=np.float32) for row in rows])
+            else:
+                matrix = np.empty((0, 0), dtype=np.float32)
+            loaded = (generation, ids, created, contexts, matrix)
+            self._loaded[creator] = loaded
+        return loaded
+
+    def lookup(self, creator, vector, context=""):
+        """Return the cached answer closest to `vector` in `context`, or None below the threshold."""
+        with self._lock:
+            _, ids, created, contexts, matrix = self._matrix(creator)
+            if not ids:
+                return None
+            scores = matrix @ _unit(vector)
+            scores[created < time.time() - self.ttl] = -1.0
+            scores[contexts != context] = -1.0
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            self._db.execute("UPDATE answers SET last_hit = ? WHERE id = ?", (time.time(), ids[best]))
+            row = self._db.execute("SELECT answer FROM answers WHERE id = ?", (ids[best],)).fetchone()
+            return row[0] if row else None
+
+    def store(self, creator, question, vector, answer, context=""):
+        """Cache `answer` for `question` in `context`, expiring stale and excess entries."""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute(
+                "INSERT INTO answers (creator, question, answer, context, vector, created_at, last_hit) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (creator, question, answer, context, _unit(vector).tobytes(), now, now)
+            )
+            self._db.execute(
+                "DELETE FROM answers WHERE creator = ? AND created_at < ?", (creator, now - self.ttl)
+            )
+            self._db.execute(
+                "DELETE FROM answers WHERE creator = ? AND id NOT IN "
+                "(SELECT id FROM answers WHERE creator = ? ORDER BY last_hit DESC LIMIT ?)",
+                (creator, creator, self.max_entries)
+            )
+            self._bump(creator)
+
+    def invalidate(self, creator):
+        """Drop every cached answer for `creator`."""
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute("DELETE FROM answers WHERE creator = ?", (creator,))
+            self._bump(creator)
+            self._loaded.pop(creator, None)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """Return the process-wide AnswerCache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache()
+        return _cache
@@ -0,0 +1,118 @@
+"""Per-creator BM25 keyword index over ingested chunks, persisted as JSON."""
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from core.vector_store import Match
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i in is it its me my of on or so that the this "
+    "to was we were what when where which who why will with you your do does did how can".split()
+)
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.casefold()) if token not in STOPWORDS]
+
+
+def bm25_index_path(creator):
+    return f"data/creators/{creator}/bm25_index.json"
+
+
+class BM25Index:
+    """Inverted index with incremental add/remove.
+
+    `docs` maps chunk id to {"text", "source", "length"}; `postings` maps a
+    term to {chunk id: term frequency}. Chunk ids are the same
+    content-addressed ids used in the vector store, so results from both
+    can be fused.
+    """
+
+    def __init__(self, docs=None, postings=None, k1=1.5, b=0.75):
+        self.docs = docs or {}
+        self.postings = postings or {}
+        self.k1 = k1
+        self.b = b
+        self.total_length = sum(doc["length"] for doc in self.docs.values())
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r") as f:
+            data = json.load(f)
+        return cls(data["docs"], data["postings"])
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"docs": self.docs, "postings": self.postings}, f)
+        os.replace(tmp_path, path)
+
+    def add(self, doc_id, text, source=None):
+        if doc_id in self.docs:
+            self.remove(doc_id)
+        counts = Counter(tokenize(text))
+        length = sum(counts.values())
+        self.docs[doc_id] = {"text": text, "source": source, "length": length}
+        self.total_length += length
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self.total_length -= doc["length"]
+        for term in set(tokenize(doc["text"])):
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def search(self, query, top_k=10):
+        """Return up to `top_k` Match objects ranked by BM25 score."""
+        if not self.docs:
+            return []
+        n = len(self.docs)
+        average_length = self.total_length / n or 1.0
+        scores = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self.docs[doc_id]["length"] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [
+            Match(doc_id, score, {"text": self.docs[doc_id]["text"], "source": self.docs[doc_id]["source"]})
+            for doc_id, score in best
+        ]
+
+
+_lock = threading.Lock()
+_loaded = {}  # creator -> ((mtime, size), BM25Index)
+
+
+def get_keyword_index(creator):
+    """Return the creator's index, reloading it only when the file changed."""
+    path = bm25_index_path(creator)
+    if not os.path.exists(path):
+        return BM25Index()
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        cached = _loaded.get(creator)
+        if cached is None or cached[0] != version:
+            cached = (version, BM25Index.load(path))
+            _loaded[creator] = cached
+        return cached[1]
@@ -0,0 +1,180 @@
+"""The answer pipeline behind the chat page, free of Streamlit.
+
+Per-visitor state lives in the `session` mapping the caller passes
+(st.session_state on the chat page, a plain dict in tools such as the load
+test), and clients default to the shared ones from core.resources, so the
+same code path can be driven with stand-ins; calls on the shared clients
+reconnect once if they fail. Every stage is timed into
+core.metrics under the creator's name, and generation goes through the
+admission controller so one busy creator can't starve the others.
+Identical questions asked at the same point of a conversation while one is
+being answered share that answer's token stream (core.singleflight), so a
+burst of visitors sending a creator's opener costs one embedding, one
+retrieval and one generation.
+"""
+import hashlib
+import itertools
+import json
+import time
+
+from core.admission import ADMISSION_SHED_MESSAGE, Overloaded, get_admission_controller
+from core.answer_cache import get_answer_cache
+from core.bm25 import get_keyword_index
+from core.context import ConversationContext, drop_current_prompt, estimate_tokens, summarize_messages
+from core.embeddings import get_embedding_cache, normalize_text
+from core.faq_index import ensure_faq_index, match_faq
+from core.llm import MAX_GEN_LEN, TimedStream, format_llama3_prompt
+from core.metrics import get_metrics
+from core.resources import with_client
+from core.retrieval import hybrid_search
+from core.singleflight import get_single_flight
+from core.vector_store import creator_namespace, get_vector_store
+
+
+def call_langchain_with_chat_memory(chat_history, user_input, username, session, bedrock=None, vector_store=None,
+                                    llm=None, on_wait=None):
+    """Yield the answer to `user_input` token by token.
+
+    The finished TimedStream (text, ttft, total) is left in
+    session["last_stream"] for the caller to log. While the request waits
+    for a generation slot, `on_wait(position)` is called (see
+    AdmissionController.acquire) so the caller can show a queued state.
+    """
+    started = time.perf_counter()
+    metrics = get_metrics()
+    conversation = session.setdefault("conversation_context", ConversationContext())
+    chat_history = drop_current_prompt(chat_history, user_input)
+    summary, recent_messages = conversation.window(chat_history)
+
+    # Attach to an in-flight answer for the same question at the same point
+    # of the conversation, or become the one that produces it
+    context = context_hash(summary, recent_messages)
+    key = (username, normalize_text(user_input), context)
+    leader = False
+
+    def produce():
+        nonlocal leader
+        leader = True
+        return _generate(user_input, username, summary, recent_messages, context, bedrock,
+                         vector_store or get_vector_store(), llm, on_wait)
+
+    stream = TimedStream(get_single_flight().stream(key, produce), started=started)
+    session["last_stream"] = stream
+    yield from stream
+    metrics.observe(username, "ttft", stream.ttft)
+    metrics.observe(username, "total", stream.total)
+    if not leader:
+        metrics.observe(username, "coalesced", stream.total)
+
+    # 8. Fold turns that left the window into the summary, off the critical path
+    conversation.fold_async(
+        chat_history + [{"role": "user", "content": user_input}, {"role": "assistant", "content": stream.text}],
+        lambda summary, messages: _summarize(llm, username, summary, messages)
+    )
+
+
+def context_hash(summary, recent_messages):
+    """Fingerprint of the conversation state the answer depends on, besides the question."""
+    state = [summary or "", [(message["role"], message["content"]) for message in recent_messages]]
+    return hashlib.sha1(json.dumps(state).encode("utf-8")).hexdigest()
+
+
+def _summarize(llm, username, summary, messages):
+    """Run summarize_messages under the same admission limits as answers."""
+    admission = get_admission_controller()
+    prompt_tokens = estimate_tokens(summary) + sum(estimate_tokens(message["content"]) for message in messages)
+    ticket = admission.acquire(username, prompt_tokens + MAX_GEN_LEN)
+    result = ""
+    try:
+        result = with_client("llm", llm, lambda client: summarize_messages(client, summary, messages))
+        return result
+    finally:
+        admission.release(ticket, used_tokens=prompt_tokens + estimate_tokens(result))
+
+
+def _generate(user_input, username, summary, recent_messages, conversation_context, bedrock, vector_store, llm,
+              on_wait):
+    """Produce the answer's tokens once per flight; callers share them via core.singleflight."""
+    metrics = get_metrics()
+
+    # 1. Generate embedding for user input (repeated questions hit the cache)
+    with metrics.span(username, "embed"):
+        input_embedding = with_client("bedrock", bedrock,
+                                      lambda client: get_embedding_cache().get_or_embed(client, user_input))
+
+    # Curated FAQ answers win over retrieval and generation
+    with metrics.span(username, "faq_match"):
+        with_client("bedrock", bedrock, lambda client: ensure_faq_index(username, client))
+        faq = match_faq(username, input_embedding)
+    if faq is not None:
+        yield faq["answer"]
+        return
+
+    # Near-duplicate of a question this clone already answered at the same
+    # point of a conversation: reuse the answer
+    with metrics.span(username, "answer_cache"):
+        cached_answer = get_answer_cache().lookup(username, input_embedding, conversation_context)
+    if cached_answer is not None:
+        yield cached_answer
+        return
+
+    # 2. Query the creator's own vector namespace and local keyword index in
+    # parallel, fused by reciprocal rank
+    with metrics.span(username, "retrieval"):
+        matches = hybrid_search(
+            vector_store,
+            get_keyword_index(username),
+            user_input,
+            input_embedding,
+            top_k=3,
+            namespace=creator_namespace(username)
+        )
+
+    # 3. Build context from matches
+    with metrics.span(username, "prompt"):
+        context = "\n".join([match.metadata["text"] for match in matches])
+
+        # 4. Build the Llama 3 prompt: retrieved context and the summary of older
+        # turns as system message, then the recent turns and the new question
+        system = f"Relevant context: {context}"
+        if summary:
+            system += f"\n\nSummary of the earlier conversation: {summary}"
+        prompt = format_llama3_prompt(system, recent_messages + [{"role": "user", "content": user_input}])
+
+    # 5. Wait for a generation slot; past the queue limits, answer with the
+    # shed-load message instead of adding to the backlog
+    admission = get_admission_controller()
+    prompt_tokens = estimate_tokens(prompt)
+    try:
+        ticket = admission.acquire(username, prompt_tokens + MAX_GEN_LEN, on_wait=on_wait)
+    except Overloaded:
+        yield ADMISSION_SHED_MESSAGE
+        return
+    metrics.observe(username, "queue", ticket.waited)
+
+    # 6. Stream tokens from Bedrock as they are generated. The slot is
+    # released however this ends, including a stream that fails to start
+    stream = None
+    try:
+        # Taken before the stream starts: _started_stream waits for the first token
+        generation_started = time.perf_counter()
+        stream = TimedStream(with_client("llm", llm, lambda client: _started_stream(client, prompt)),
+                             started=generation_started)
+        yield from stream
+    finally:
+        generated = stream.text if stream is not None else ""
+        admission.release(ticket, used_tokens=prompt_tokens + estimate_tokens(generated))
+    metrics.observe(username, "first_token", stream.ttft)
+    metrics.observe(username, "generation", stream.total)
+
+    # 7. Remember the answer for near-duplicate questions
+    if stream.text.strip():
+        get_answer_cache().store(username, user_input, input_embedding, stream.text, conversation_context)
+
+
+def _started_stream(llm, prompt):
+    """Start streaming and wait for the first token, so a failed connection
+    surfaces here (where it can be retried) rather than mid-answer."""
+    tokens = iter(llm.stream(prompt))
+    first = next(tokens, None)
+    return itertools.chain([] if first is None else [first], tokens)
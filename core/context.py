@@ -0,0 +1,87 @@
+"""Bounded chat context: recent turns verbatim plus a rolling summary of the rest."""
+import logging
+import os
+import threading
+
+from core.llm import format_llama3_prompt
+
+CONTEXT_WINDOW_TURNS = int(os.getenv("CONTEXT_WINDOW_TURNS", "4"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def drop_current_prompt(messages, user_input):
+    """Strip the just-typed prompt if the caller already appended it to the history."""
+    if messages and messages[-1]["role"] == "user" and messages[-1]["content"] == user_input:
+        return messages[:-1]
+    return messages
+
+
+def summarize_messages(llm, summary, messages):
+    """Fold `messages` into `summary` with one short LLM call."""
+    transcript = "\n".join(
+        f"{'User' if message['role'] == 'user' else 'Assistant'}: {message['content']}" for message in messages
+    )
+    prompt = format_llama3_prompt(
+        "You maintain a running summary of a conversation. Merge the new lines into the summary. "
+        "Keep names, facts and open questions; stay under 150 words. Reply with the summary only.",
+        [{"role": "user", "content": f"Summary so far:\n{summary or '(empty)'}\n\nNew lines:\n{transcript}"}]
+    )
+    return llm.invoke(prompt).strip()
+
+
+class ConversationContext:
+    """Per-session prompt context with a flat upper bound.
+
+    The last `window_turns` user/assistant turns are kept verbatim, trimmed
+    further if they would exceed `token_budget` together with the summary.
+    Older messages are folded into `summary` in the background after a reply,
+    so the next turn usually finds it ready.
+    """
+
+    def __init__(self, window_turns=CONTEXT_WINDOW_TURNS, token_budget=CONTEXT_TOKEN_BUDGET):
+        self.window_turns = window_turns
+        self.token_budget = token_budget
+        self.summary = ""
+        self.folded = 0  # leading messages already covered by the summary
+        self._worker = None
+
+    def _split(self, messages):
+        pending = messages[self.folded:]
+        window = pending[-2 * self.window_turns:] if self.window_turns else []
+        budget = self.token_budget - estimate_tokens(self.summary)
+        while window and sum(estimate_tokens(message["content"]) for message in window) > budget:
+            window = window[1:]
+        return pending[:len(pending) - len(window)], window
+
+    def window(self, messages):
+        """Return (summary, recent messages) to put in the prompt."""
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+        _, window = self._split(messages)
+        return self.summary, window
+
+    def fold_async(self, messages, summarize):
+        """Start folding messages that fell out of the window into the summary."""
+        overflow, _ = self._split(messages)
+        if not overflow:
+            return
+        folded = self.folded + len(overflow)
+
+        def run():
+            try:
+                self.summary = summarize(self.summary, overflow)
+                self.folded = folded
+            except Exception:
+                # Keep the old summary; the overflow is retried after the next turn
+                logger.exception("Error summarizing conversation")
+
+        self._worker = threading.Thread(target=run, daemon=True)
+        self._worker.start()
@@ -0,0 +1,121 @@
+"""Live per-creator counters behind stats.csv.
+
+Chat sessions call `record` on every turn; increments are buffered in
+process and a background thread merges them into stats.csv every
+COUNTER_FLUSH_SECONDS. A merge holds an exclusive flock on stats.csv.lock,
+re-reads the current totals, adds this process's deltas and atomically
+renames the new file into place, so any number of Streamlit processes can
+flush without losing updates, and readers never need the lock: they always
+see one complete file. Unique users are counted by session with a
+HyperLogLog (stats_visitors.hll) whose registers merge with max, so
+processes never need to share the set of sessions they have seen.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+from core.locking import file_lock
+from core.rollup import HyperLogLog
+
+COUNTER_FLUSH_SECONDS = float(os.getenv("COUNTER_FLUSH_SECONDS", "5"))
+COUNTER_FIELDS = ["total_chats", "total_messages", "unique_users"]
+
+logger = logging.getLogger(__name__)
+
+
+def stats_path(creator):
+    return f"data/creators/{creator}/stats.csv"
+
+
+def read_stats(creator):
+    """Return the last flushed totals as a dict (zeros if nothing flushed yet)."""
+    path = stats_path(creator)
+    if not os.path.exists(path):
+        return {field: 0 for field in COUNTER_FIELDS}
+    row = pd.read_csv(path).iloc[0]
+    return {field: int(row.get(field, 0)) for field in COUNTER_FIELDS}
+
+
+class LiveCounters:
+    def __init__(self, flush_interval=COUNTER_FLUSH_SECONDS):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._deltas = defaultdict(Counter)
+        self._visitors = {}  # creator -> HyperLogLog of sessions seen since last flush
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="counter-flush", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, creator, messages=0, chats=0, session_id=None):
+        with self._lock:
+            deltas = self._deltas[creator]
+            deltas["total_messages"] += messages
+            deltas["total_chats"] += chats
+            if session_id:
+                self._visitors.setdefault(creator, HyperLogLog()).add(session_id)
+
+    def flush(self, creator=None):
+        """Merge buffered increments into stats.csv (all creators by default)."""
+        with self._lock:
+            creators = [creator] if creator is not None else list(set(self._deltas) | set(self._visitors))
+            pending = {name: (self._deltas.pop(name, Counter()), self._visitors.pop(name, None)) for name in creators}
+        for name, (deltas, visitors) in pending.items():
+            if not deltas and visitors is None:
+                continue
+            try:
+                self._merge(name, deltas, visitors)
+            except Exception:
+                # Put the increments back so the next flush retries them
+                with self._lock:
+                    self._deltas[name].update(deltas)
+                    if visitors is not None:
+                        self._visitors.setdefault(name, HyperLogLog()).merge(visitors)
+                raise
+
+    def _merge(self, creator, deltas, visitors):
+        path = stats_path(creator)
+        hll_path = f"data/creators/{creator}/stats_visitors.hll"
+        with file_lock(f"{path}.lock"):
+            totals = read_stats(creator)
+            for field, value in deltas.items():
+                totals[field] += value
+            if visitors is not None:
+                if os.path.exists(hll_path):
+                    with open(hll_path, "rb") as f:
+                        visitors.merge(HyperLogLog(registers=bytearray(f.read())))
+                tmp_path = f"{hll_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(bytes(visitors.registers))
+                os.replace(tmp_path, hll_path)
+                totals["unique_users"] = visitors.count()
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            pd.DataFrame([totals], columns=COUNTER_FIELDS).to_csv(tmp_path, index=False)
+            os.replace(tmp_path, path)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Counter flush failed, will retry")
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+
+_live_counters = None
+_live_counters_lock = threading.Lock()
+
+
+def get_live_counters():
+    global _live_counters
+    with _live_counters_lock:
+        if _live_counters is None:
+            _live_counters = LiveCounters()
+        return _live_counters
@@ -0,0 +1,96 @@
+"""SQLite-backed creator registry keyed by username.
+
+Replaces full-scan reads of data/creators.csv: lookups go through the
+primary-key index and writes are single-row transactions, so concurrent
+signups cannot overwrite each other. The CSV is imported once, the first
+time the database is opened.
+"""
+import csv
+import os
+import sqlite3
+import threading
+
+CREATORS_DB_PATH = os.getenv("CREATORS_DB_PATH", "data/creators.db")
+LEGACY_CREATORS_CSV = "data/creators.csv"
+CREATOR_COLUMNS = ("username", "name", "password")
+
+
+class CreatorStore:
+    def __init__(self, path=CREATORS_DB_PATH, legacy_csv=LEGACY_CREATORS_CSV):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS creators (
+                username TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                password TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY);
+        """)
+        self.migrate_from_csv(legacy_csv)
+
+    def migrate_from_csv(self, csv_path):
+        """Import creators.csv once; later runs are no-ops."""
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            if self._db.execute("SELECT 1 FROM migrations WHERE name = 'creators_csv'").fetchone():
+                return
+            if os.path.exists(csv_path):
+                with open(csv_path, newline="") as f:
+                    rows = [
+                        (row["username"], row["name"], row["password"])
+                        for row in csv.DictReader(f) if row.get("username")
+                    ]
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO creators (username, name, password) VALUES (?, ?, ?)", rows
+                )
+            self._db.execute("INSERT INTO migrations (name) VALUES ('creators_csv')")
+
+    def get(self, username):
+        """Return the creator as a dict, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT username, name, password FROM creators WHERE username = ?", (username,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def create(self, username, name, password):
+        """Insert a creator; return False if the username is taken."""
+        try:
+            with self._lock, self._db:
+                self._db.execute("BEGIN IMMEDIATE")
+                self._db.execute(
+                    "INSERT INTO creators (username, name, password) VALUES (?, ?, ?)", (username, name, password)
+                )
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def update(self, username, fields):
+        """Update registry columns of one creator; other keys are ignored."""
+        updates = {key: value for key, value in fields.items() if key in CREATOR_COLUMNS and key != "username"}
+        if not updates:
+            return
+        assignments = ", ".join(f"{key} = ?" for key in updates)
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute(
+                f"UPDATE creators SET {assignments} WHERE username = ?", (*updates.values(), username)
+            )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_creator_store():
+    """Return the process-wide CreatorStore, creating it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CreatorStore()
+        return _store
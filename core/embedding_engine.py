@@ -0,0 +1,130 @@
+"""Concurrent Titan embedding for ingestion, with retries on throttling."""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.embeddings import EMBED_MODEL_ID, embed_text
+
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "8"))
+
+THROTTLING_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
+
+
+class EmbeddingError(Exception):
+    """Raised when some chunks could not be embedded even after retrying."""
+
+    def __init__(self, failed, errors):
+        self.failed = failed
+        self.errors = errors
+        super().__init__(f"{len(failed)} chunk(s) failed to embed; first error: {errors[0]}")
+
+
+def is_throttling_error(error):
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in THROTTLING_ERROR_CODES
+
+
+class EmbeddingEngine:
+    """Embed many texts with a bounded worker pool, keeping input order.
+
+    The pool lives as long as the engine (call `close()` or use it as a
+    context manager), so `concurrency` bounds Bedrock calls across every
+    batch of a stream. Callers can keep several batches in flight with
+    `submit` and `gather` so a throttled chunk only delays its own batch.
+    Throttled calls are retried with exponential backoff and full jitter;
+    any other error fails that text immediately. Nothing is dropped
+    silently: `gather` and `embed_many` raise EmbeddingError if a text failed.
+    """
+
+    def __init__(self, bedrock, model_id=EMBED_MODEL_ID, concurrency=EMBED_CONCURRENCY,
+                 max_retries=6, base_delay=0.5, max_delay=20.0):
+        self.bedrock = bedrock
+        self.model_id = model_id
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embed")
+        self._in_flight = 0
+        self._busy_since = None
+        self.chunks = 0
+        self.failures = 0
+        self.retries = 0
+        self.seconds = 0.0  # wall time with at least one batch in flight
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _embed_one(self, text):
+        attempt = 0
+        while True:
+            try:
+                return embed_text(self.bedrock, text, self.model_id)
+            except Exception as e:
+                if not is_throttling_error(e) or attempt >= self.max_retries:
+                    raise
+                with self._lock:
+                    self.retries += 1
+                time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+                attempt += 1
+
+    def _attempt(self, text):
+        try:
+            return self._embed_one(text), None
+        except Exception as e:
+            return None, e
+
+    def submit(self, texts):
+        """Queue `texts` on the shared pool; pass the result to `gather`."""
+        with self._lock:
+            if not self._in_flight:
+                self._busy_since = time.perf_counter()
+            self._in_flight += 1
+        return [self._pool.submit(self._attempt, text) for text in texts]
+
+    def gather(self, futures):
+        """Wait for a submitted batch and return its embeddings in order."""
+        results = [future.result() for future in futures]
+        failed = [i for i, (_, error) in enumerate(results) if error is not None]
+        with self._lock:
+            self.chunks += len(results) - len(failed)
+            self.failures += len(failed)
+            self._in_flight -= 1
+            if not self._in_flight:
+                self.seconds += time.perf_counter() - self._busy_since
+        if failed:
+            raise EmbeddingError(failed, [results[i][1] for i in failed])
+        return [embedding for embedding, _ in results]
+
+    def embed_many(self, texts):
+        """Return one embedding per text, in the same order as `texts`."""
+        return self.gather(self.submit(list(texts)))
+
+    def stats(self):
+        return {
+            "chunks": self.chunks,
+            "failures": self.failures,
+            "retries": self.retries,
+            "seconds": self.seconds,
+            "chunks_per_sec": self.chunks / self.seconds if self.seconds else 0.0,
+        }
+
+    def report(self):
+        stats = self.stats()
+        return (f"Embedded {stats['chunks']} chunks in {stats['seconds']:.1f}s "
+                f"({stats['chunks_per_sec']:.1f} chunks/sec), "
+                f"{stats['retries']} retries, {stats['failures']} failures")
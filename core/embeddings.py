@@ -0,0 +1,153 @@
+"""Titan text embeddings with a two-tier (in-process LRU + SQLite) cache."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+
+EMBED_MODEL_ID = "amazon.titan-embed-text-v2:0"
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "data/cache/embeddings.sqlite")
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "2048"))
+
+
+def normalize_text(text):
+    """Normalize text so trivially different inputs share one cache entry."""
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split()).casefold()
+
+
+def embed_text(bedrock, text, model_id=EMBED_MODEL_ID):
+    """Call Bedrock once and return the embedding as a list of floats."""
+    response = bedrock.invoke_model(
+        body=json.dumps({"inputText": text}),
+        modelId=model_id,
+        contentType="application/json"
+    )
+    response_body = json.loads(response["body"].read())
+    if "embedding" not in response_body:
+        raise ValueError("Embedding not found in Bedrock response")
+    return response_body["embedding"]
+
+
+class EmbeddingCache:
+    """Embeddings keyed by (model id, normalized text).
+
+    Lookups go to a bounded in-memory LRU first and then to a SQLite file,
+    which survives Streamlit restarts and is shared by every process on the
+    host. Vectors are stored as packed float32.
+    """
+
+    def __init__(self, path=EMBED_CACHE_PATH, max_entries=EMBED_CACHE_SIZE):
+        self.path = path
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, model_id TEXT, vector BLOB)"
+        )
+
+    @staticmethod
+    def make_key(text, model_id=EMBED_MODEL_ID):
+        # "v2": earlier entries were embedded from the casefolded text and
+        # drifted from document vectors, so they are never looked up again
+        return hashlib.sha256(f"v2\0{model_id}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def peek(self, text, model_id=EMBED_MODEL_ID):
+        """Return the cached embedding or None without touching the hit counters
+        or the LRU order, for bulk readers such as question clustering."""
+        key = self.make_key(text, model_id)
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key]
+            row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        return array("f", row[0]).tolist() if row is not None else None
+
+    def peek_many(self, texts, model_id=EMBED_MODEL_ID):
+        """`peek` for several texts, reading the misses from disk in one query."""
+        keys = [self.make_key(text, model_id) for text in texts]
+        with self._lock:
+            found = {key: self._memory[key] for key in keys if key in self._memory}
+            missing = [key for key in keys if key not in found]
+            for start in range(0, len(missing), 500):
+                part = missing[start:start + 500]
+                found.update((key, array("f", vector).tolist()) for key, vector in self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({', '.join('?' * len(part))})", part
+                ))
+        return [found.get(key) for key in keys]
+
+    def get(self, text, model_id=EMBED_MODEL_ID):
+        """Return the cached embedding or None, updating the hit counters."""
+        key = self.make_key(text, model_id)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+            row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            vector = array("f", row[0]).tolist()
+            self.disk_hits += 1
+            self._remember(key, vector)
+            return vector
+
+    def put(self, text, vector, model_id=EMBED_MODEL_ID):
+        key = self.make_key(text, model_id)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings (key, model_id, vector) VALUES (?, ?, ?)",
+                (key, model_id, array("f", vector).tobytes())
+            )
+            self._remember(key, list(vector))
+
+    def get_or_embed(self, bedrock, text, model_id=EMBED_MODEL_ID):
+        """Return the embedding for `text`, calling Bedrock only on a miss.
+
+        The cache key is the normalized text, but Bedrock gets `text` as
+        typed, the same way ingestion embeds documents.
+        """
+        vector = self.get(text, model_id)
+        if vector is None:
+            vector = embed_text(bedrock, text, model_id)
+            self.put(text, vector, model_id)
+        return vector
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """Return the process-wide EmbeddingCache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
@@ -0,0 +1,159 @@
+"""Append-only, per-creator chat event log with compressed segment rotation.
+
+Events are JSON lines appended to events/current.jsonl. Once that file
+passes EVENT_SEGMENT_BYTES it is compressed with zstandard into an immutable
+segment and recorded in events/index.json with the time range it covers, so
+time-range readers open only the segments they need.
+
+Record fields: ts (unix seconds), creator, session_id, turn, role, text,
+tokens, and for assistant replies latency and ttft (seconds).
+"""
+import json
+import os
+import time
+
+import zstandard
+
+from core.locking import file_lock
+
+EVENT_SEGMENT_BYTES = int(os.getenv("EVENT_SEGMENT_BYTES", str(4 * 1024 * 1024)))
+
+
+def events_dir(creator):
+    return f"data/creators/{creator}/events"
+
+
+def _locked(directory, shared=False):
+    # One writer at a time across Streamlit processes on this host; readers
+    # take the lock shared so they never see a half-finished rotation
+    return file_lock(os.path.join(directory, ".lock"), shared=shared)
+
+
+def load_segment_index(creator):
+    path = os.path.join(events_dir(creator), "index.json")
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _save_segment_index(directory, segments):
+    path = os.path.join(directory, "index.json")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(segments, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def _rotate(directory):
+    current = os.path.join(directory, "current.jsonl")
+    with open(current, "rb") as f:
+        data = f.read()
+    lines = [json.loads(line) for line in data.splitlines() if line.strip()]
+    if not lines:
+        return
+    segments = []
+    index_path = os.path.join(directory, "index.json")
+    if os.path.exists(index_path):
+        with open(index_path, "r") as f:
+            segments = json.load(f)
+    name = f"segment-{len(segments):06d}.jsonl.zst"
+    tmp_path = os.path.join(directory, f"{name}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(zstandard.ZstdCompressor(level=10).compress(data))
+    os.replace(tmp_path, os.path.join(directory, name))
+    segments.append({
+        "file": name,
+        "start": min(event["ts"] for event in lines),
+        "end": max(event["ts"] for event in lines),
+        "count": len(lines),
+    })
+    _save_segment_index(directory, segments)
+    os.truncate(current, 0)
+
+
+def append_events(creator, events):
+    """Append event dicts (ts is filled in if missing) and rotate if needed."""
+    directory = events_dir(creator)
+    now = time.time()
+    payload = "".join(
+        json.dumps({"ts": now, "creator": creator, **event}, ensure_ascii=False) + "\n" for event in events
+    )
+    with _locked(directory):
+        current = os.path.join(directory, "current.jsonl")
+        with open(current, "a", encoding="utf-8") as f:
+            f.write(payload)
+        if os.path.getsize(current) >= EVENT_SEGMENT_BYTES:
+            _rotate(directory)
+
+
+def _parse(data):
+    for line in data.splitlines():
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # a line being written right now
+
+
+def read_events(creator, start=None, end=None):
+    """Yield events in time order with start <= ts < end (either bound optional).
+
+    Compressed segments outside the range are skipped using the index.
+    """
+    directory = events_dir(creator)
+    if not os.path.isdir(directory):
+        return
+    current = os.path.join(directory, "current.jsonl")
+    with _locked(directory, shared=True):
+        segments = load_segment_index(creator)
+        tail = b""
+        if os.path.exists(current):
+            with open(current, "rb") as f:
+                tail = f.read()
+
+    # Segments are immutable once indexed, so they can be read without the lock
+    in_range = lambda event: (start is None or event["ts"] >= start) and (end is None or event["ts"] < end)
+    for segment in segments:
+        if (start is not None and segment["end"] < start) or (end is not None and segment["start"] >= end):
+            continue
+        with open(os.path.join(directory, segment["file"]), "rb") as f:
+            data = zstandard.ZstdDecompressor().decompress(f.read())
+        for event in _parse(data):
+            if in_range(event):
+                yield event
+    for event in _parse(tail):
+        if in_range(event):
+            yield event
+
+
+def read_new_events(creator, cursor=None):
+    """Return (events appended after `cursor`, new cursor).
+
+    A cursor is {"segments": rotated segments fully consumed, "offset": bytes
+    consumed of the data after them}. It stays valid across rotations because
+    a rotated segment holds exactly the bytes current.jsonl had. Only
+    complete lines are consumed.
+    """
+    cursor = cursor or {"segments": 0, "offset": 0}
+    directory = events_dir(creator)
+    if not os.path.isdir(directory):
+        return [], cursor
+    current = os.path.join(directory, "current.jsonl")
+    with _locked(directory, shared=True):
+        segments = load_segment_index(creator)
+        tail = b""
+        if os.path.exists(current):
+            with open(current, "rb") as f:
+                tail = f.read()
+
+    events = []
+    offset = cursor["offset"]
+    for segment in segments[cursor["segments"]:]:
+        with open(os.path.join(directory, segment["file"]), "rb") as f:
+            data = zstandard.ZstdDecompressor().decompress(f.read())
+        events.extend(_parse(data[offset:]))
+        offset = 0
+    complete = tail[offset:tail.rfind(b"\n") + 1] if tail.rfind(b"\n") >= offset else b""
+    events.extend(_parse(complete))
+    return events, {"segments": len(segments), "offset": offset + len(complete)}
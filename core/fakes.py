@@ -0,0 +1,175 @@
+"""Local stand-ins for Bedrock and the vector index, for load tests and benchmarks.
+
+They mimic only the calls this repo makes (`invoke_model` for Titan
+embeddings, `stream`/`invoke` on the LLM, and the VectorStore interface),
+with configurable latency and throttling. Throttled calls raise the same
+botocore ClientError ("ThrottlingException") the real services do, so the
+retry and error paths are exercised too. Embeddings are deterministic
+functions of the normalized text.
+"""
+import io
+import json
+import random
+import threading
+import time
+import zlib
+
+import numpy as np
+from botocore.exceptions import ClientError
+
+from core.embeddings import normalize_text
+from core.vector_store import Match, VectorStore, matches_filter
+
+FAKE_EMBED_DIM = 1024
+
+
+def fake_embedding(text, dim=FAKE_EMBED_DIM):
+    """Unit vector seeded by the text, so equal texts always embed equally."""
+    rng = np.random.default_rng(zlib.crc32(normalize_text(text).encode("utf-8")))
+    vector = rng.standard_normal(dim).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class Latency:
+    """Sleep for `mean` seconds, +/- up to `jitter` (a fraction of the mean)."""
+
+    def __init__(self, mean=0.0, jitter=0.2):
+        self.mean = mean
+        self.jitter = jitter
+
+    def sample(self):
+        return max(0.0, self.mean * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def wait(self):
+        if self.mean > 0:
+            time.sleep(self.sample())
+
+
+class RateLimiter:
+    """Token bucket admitting `rate` calls per second; None admits everything."""
+
+    def __init__(self, rate=None, operation="InvokeModel"):
+        self.rate = rate
+        self.operation = operation
+        self.tokens = rate or 0
+        self.updated = time.monotonic()
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            self.throttled += 1
+        raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, self.operation)
+
+
+class FakeBedrock:
+    """bedrock-runtime client answering Titan embedding requests."""
+
+    def __init__(self, latency=None, rate=None, dim=FAKE_EMBED_DIM):
+        self.latency = latency or Latency()
+        self.limiter = RateLimiter(rate)
+        self.dim = dim
+        self.calls = 0
+
+    def invoke_model(self, body, modelId, contentType="application/json", **kwargs):
+        self.limiter.acquire()
+        self.latency.wait()
+        self.calls += 1
+        text = json.loads(body)["inputText"]
+        payload = json.dumps({"embedding": fake_embedding(text, self.dim), "inputTextTokenCount": len(text.split())})
+        return {"body": io.BytesIO(payload.encode("utf-8"))}
+
+
+class FakeLLM:
+    """Streaming LLM: first token after `ttft`, then one token every `token_interval`."""
+
+    def __init__(self, ttft=None, token_interval=0.0, tokens=64, rate=None):
+        self.ttft = ttft or Latency()
+        self.token_interval = token_interval
+        self.tokens = tokens
+        self.limiter = RateLimiter(rate, operation="InvokeModelWithResponseStream")
+        self.calls = 0
+
+    def stream(self, prompt):
+        self.limiter.acquire()
+        self.calls += 1
+        self.ttft.wait()
+        for i in range(self.tokens):
+            if i and self.token_interval:
+                time.sleep(self.token_interval)
+            yield f"token{i} "
+
+    def invoke(self, prompt):
+        return "".join(self.stream(prompt))
+
+
+class FakeVectorStore(VectorStore):
+    """In-memory exact cosine search with an optional per-query delay."""
+
+    def __init__(self, latency=None):
+        self.latency = latency or Latency()
+        self._namespaces = {}  # namespace -> {id: (unit vector, metadata)}
+        self._stacked = {}  # namespace -> (ids, matrix, metadata), rebuilt after writes
+        self._lock = threading.Lock()
+
+    def _stack(self, namespace):
+        if namespace not in self._stacked:
+            space = self._namespaces.get(namespace, {})
+            ids = list(space)
+            matrix = np.stack([space[vector_id][0] for vector_id in ids]) if ids else None
+            self._stacked[namespace] = (ids, matrix, [space[vector_id][1] for vector_id in ids])
+        return self._stacked[namespace]
+
+    def query(self, vector, top_k=3, filter=None, namespace=""):
+        self.latency.wait()
+        with self._lock:
+            ids, matrix, metadata = self._stack(namespace)
+        if matrix is None:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        scores = matrix @ query
+        if filter is not None:
+            alive = np.fromiter((matches_filter(item, filter) for item in metadata), dtype=bool, count=len(ids))
+            scores[~alive] = -np.inf
+        top = [row for row in np.argsort(-scores)[:top_k] if scores[row] > -np.inf]
+        return [Match(ids[row], float(scores[row]), metadata[row]) for row in top]
+
+    def upsert(self, vectors, namespace=""):
+        with self._lock:
+            space = self._namespaces.setdefault(namespace, {})
+            for vector in vectors:
+                values = np.asarray(vector["values"], dtype=np.float32)
+                space[vector["id"]] = (values / max(float(np.linalg.norm(values)), 1e-12), vector.get("metadata") or {})
+            self._stacked.pop(namespace, None)
+
+    def delete(self, ids, namespace=""):
+        with self._lock:
+            space = self._namespaces.get(namespace, {})
+            for vector_id in ids:
+                space.pop(vector_id, None)
+            self._stacked.pop(namespace, None)
+
+    def list_ids(self, prefix="", namespace="", page_size=100):
+        with self._lock:
+            ids = [vector_id for vector_id in self._namespaces.get(namespace, {}) if vector_id.startswith(prefix)]
+        for start in range(0, len(ids), page_size):
+            yield ids[start:start + page_size]
+
+    def fetch(self, ids, namespace=""):
+        with self._lock:
+            space = self._namespaces.get(namespace, {})
+            return [{"id": vector_id, "values": space[vector_id][0].tolist(), "metadata": dict(space[vector_id][1])}
+                    for vector_id in ids if vector_id in space]
+
+    def count(self, namespace=""):
+        with self._lock:
+            return len(self._namespaces.get(namespace, {}))
@@ -0,0 +1,117 @@
+"""Embedding index over a creator's curated FAQ questions.
+
+The index lives next to faqs.json as faq_index.json and maps FAQ id to the
+question, the curated answer and the question embedding. The dashboard
+updates single entries when an FAQ is saved or deleted; the chat page
+rebuilds only missing or changed entries if faqs.json is newer than the
+index (e.g. after a failed update).
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+from core.embeddings import get_embedding_cache
+
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.9"))
+
+_lock = threading.Lock()
+# username -> ((mtime, size) of the index file, faq ids, unit question matrix, index)
+_matrices = {}
+
+
+def faqs_path(username):
+    return f"data/creators/{username}/faqs.json"
+
+
+def faq_index_path(username):
+    return f"data/creators/{username}/faq_index.json"
+
+
+def load_faq_index(username):
+    path = faq_index_path(username)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_faq_index(username, index):
+    path = faq_index_path(username)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, path)
+
+
+def _entry(faq, bedrock, previous=None):
+    if previous is not None and previous["question"] == faq["question"]:
+        embedding = previous["embedding"]
+    else:
+        embedding = get_embedding_cache().get_or_embed(bedrock, faq["question"])
+    return {"question": faq["question"], "answer": faq["answer"], "embedding": embedding}
+
+
+def update_faq_index(username, faq, bedrock):
+    """Add or refresh one FAQ, embedding its question only if it changed."""
+    with _lock:
+        index = load_faq_index(username)
+        index[faq["id"]] = _entry(faq, bedrock, index.get(faq["id"]))
+        save_faq_index(username, index)
+
+
+def remove_from_faq_index(username, faq_id):
+    with _lock:
+        index = load_faq_index(username)
+        if index.pop(faq_id, None) is not None:
+            save_faq_index(username, index)
+
+
+def ensure_faq_index(username, bedrock):
+    """Bring the index in line with faqs.json if faqs.json was written after it."""
+    source = faqs_path(username)
+    if not os.path.exists(source):
+        return
+    target = faq_index_path(username)
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+        return
+    with open(source, "r") as f:
+        faqs = json.load(f)
+    with _lock:
+        index = load_faq_index(username)
+        save_faq_index(username, {faq["id"]: _entry(faq, bedrock, index.get(faq["id"])) for faq in faqs})
+
+
+def _matrix(username):
+    path = faq_index_path(username)
+    if not os.path.exists(path):
+        return None, [], None
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _matrices.get(username)
+    if cached is None or cached[0] != version:
+        index = load_faq_index(username)
+        ids = list(index)
+        matrix = None
+        if ids:
+            matrix = np.array([index[faq_id]["embedding"] for faq_id in ids], dtype=np.float32)
+            matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        cached = (version, ids, matrix, index)
+        _matrices[username] = cached
+    return cached[3], cached[1], cached[2]
+
+
+def match_faq(username, vector, threshold=FAQ_MATCH_THRESHOLD):
+    """Return the FAQ entry whose question best matches `vector`, or None."""
+    with _lock:
+        index, ids, matrix = _matrix(username)
+    if not ids:
+        return None
+    query = np.asarray(vector, dtype=np.float32)
+    scores = matrix @ (query / max(np.linalg.norm(query), 1e-12))
+    best = int(np.argmax(scores))
+    if scores[best] < threshold:
+        return None
+    return index[ids[best]]
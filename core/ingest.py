@@ -0,0 +1,283 @@
+"""Incremental, streaming ingestion into a vector store.
+
+Chunks flow through bounded queues (read/chunk -> embed -> upsert), so memory
+stays flat regardless of corpus size and a slow stage holds back the ones
+before it. Vector ids are content hashes; a per-source manifest records what
+is stored and a checkpoint file records each committed upsert batch, so an
+interrupted run resumes without re-embedding committed chunks.
+"""
+import collections
+import hashlib
+import json
+import os
+import queue
+import threading
+
+UPSERT_MAX_VECTORS = 100
+UPSERT_MAX_BYTES = 2 * 1024 * 1024
+EMBED_BATCH_SIZE = 32
+QUEUE_DEPTH = 4
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def vector_id(owner, source, text):
+    """Stable id for one chunk: the same text from the same source always maps
+    to the same vector, across processes and runs."""
+    return f"{owner}#{content_hash(source)[:16]}#{content_hash(text)[:32]}"
+
+
+def manifest_path(creator):
+    return f"data/creators/{creator}/ingest_manifest.json"
+
+
+def checkpoint_path(creator):
+    return f"data/creators/{creator}/ingest_checkpoint.jsonl"
+
+
+class IngestManifest:
+    """Chunk ids currently stored in the index, per source."""
+
+    def __init__(self, sources=None):
+        self.sources = sources or {}
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r") as f:
+            return cls(json.load(f)["sources"])
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"sources": self.sources}, f, indent=4)
+        os.replace(tmp_path, path)
+
+    def stored(self, source):
+        return set(self.sources.get(source, []))
+
+
+def read_blocks(pieces, block_chars=65536):
+    """Regroup an iterable of text pieces into blocks of roughly `block_chars`.
+
+    Blocks end on a paragraph (or at least line) break where possible, so the
+    text splitter sees natural boundaries.
+    """
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        while len(buffer) >= block_chars:
+            cut = buffer.rfind("\n\n", 0, block_chars)
+            if cut <= 0:
+                cut = buffer.rfind("\n", 0, block_chars)
+            cut = block_chars if cut <= 0 else cut + 1
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+    if buffer.strip():
+        yield buffer
+
+
+def iter_file_chunks(file_path, splitter=None, block_chars=65536):
+    """Yield text chunks of a file without reading it into memory at once."""
+    if splitter is None:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    with open(file_path, "r", encoding="utf-8") as f:
+        for block in read_blocks(iter(lambda: f.read(block_chars), ""), block_chars):
+            yield from splitter.split_text(block)
+
+
+def load_checkpoint(path, source):
+    """Ids of `source` committed by an interrupted run."""
+    committed = set()
+    if path and os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash
+                if record["source"] == source:
+                    committed.update(record["ids"])
+    return committed
+
+
+def clear_checkpoint(path, source):
+    """Drop `source`'s records from the checkpoint, keeping other sources' for their resume."""
+    if not path or not os.path.exists(path):
+        return
+    kept = []
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record["source"] != source:
+                kept.append(line if line.endswith("\n") else line + "\n")
+    if not kept:
+        os.remove(path)
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.writelines(kept)
+    os.replace(tmp_path, path)
+
+
+def _put(q, item, stop):
+    # Block while the next stage is behind, but give up once the run is aborted
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def ingest_chunks(owner, source, chunks, engine, vector_store, manifest, metadata=None, namespace="",
+                  checkpoint=None, embed_batch=EMBED_BATCH_SIZE, max_batch_vectors=UPSERT_MAX_VECTORS,
+                  max_batch_bytes=UPSERT_MAX_BYTES, queue_depth=QUEUE_DEPTH, keyword_index=None):
+    """Bring the index in line with `chunks`, the current content of `source`.
+
+    `chunks` may be any iterable, including a generator over a huge file.
+    Only chunks whose id is not stored yet are embedded and upserted, in
+    batches capped at `max_batch_vectors` vectors and `max_batch_bytes` of
+    JSON; each committed batch is appended to the `checkpoint` file. Ids the
+    manifest lists for `source` that are no longer produced are deleted at the
+    end. The manifest is updated in place and the source's checkpoint records
+    are removed (other sources' stay for their resume); the caller persists
+    the manifest.
+
+    If a BM25 `keyword_index` is given, every chunk of `source` is added to
+    it (including unchanged chunks it is missing) and removed chunks are
+    dropped from it; the caller persists it along with the manifest.
+    """
+    stored = manifest.stored(source) | load_checkpoint(checkpoint, source)
+    seen = {}  # id -> None, keeps first-seen order
+    to_embed = queue.Queue(maxsize=queue_depth * embed_batch)
+    to_upsert = queue.Queue(maxsize=queue_depth)
+    stop = threading.Event()
+    errors = []
+    done = object()
+
+    def read_stage():
+        try:
+            for text in chunks:
+                chunk_id = vector_id(owner, source, text)
+                if chunk_id in seen:
+                    continue
+                seen[chunk_id] = None
+                if keyword_index is not None and chunk_id not in keyword_index.docs:
+                    keyword_index.add(chunk_id, text, source)
+                if chunk_id not in stored and not _put(to_embed, (chunk_id, text), stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(to_embed, done, stop)
+
+    def embed_stage():
+        # Up to `queue_depth` batches embed at once on the engine's shared
+        # pool, so a throttled chunk holds back only its own batch; batches
+        # are handed to the upsert stage in order
+        in_flight = collections.deque()
+
+        def emit_oldest():
+            batch, futures = in_flight.popleft()
+            embeddings = engine.gather(futures)
+            vectors = [{
+                "id": chunk_id,
+                "values": embedding,
+                "metadata": {**(metadata or {}), "text": text, "source": source}
+            } for (chunk_id, text), embedding in zip(batch, embeddings)]
+            return _put(to_upsert, vectors, stop)
+
+        try:
+            finished = False
+            while not finished and not stop.is_set():
+                batch = []
+                while len(batch) < embed_batch and not stop.is_set():
+                    try:
+                        item = to_embed.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if item is done:
+                        finished = True
+                        break
+                    batch.append(item)
+                if batch:
+                    in_flight.append((batch, engine.submit([text for _, text in batch])))
+                # Pass on finished batches; wait only once the window is full
+                while in_flight and (len(in_flight) >= queue_depth or all(f.done() for f in in_flight[0][1])):
+                    if not emit_oldest():
+                        return
+            while in_flight and not stop.is_set():
+                if not emit_oldest():
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            for _, futures in in_flight:
+                for future in futures:
+                    future.cancel()
+            _put(to_upsert, done, stop)
+
+    threads = [threading.Thread(target=read_stage, daemon=True), threading.Thread(target=embed_stage, daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    added = 0
+    batch, batch_bytes = [], 0
+
+    def commit(batch):
+        vector_store.upsert(batch, namespace=namespace)
+        if checkpoint:
+            with open(checkpoint, "a") as f:
+                f.write(json.dumps({"source": source, "ids": [v["id"] for v in batch]}) + "\n")
+        return len(batch)
+
+    try:
+        while True:
+            try:
+                item = to_upsert.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set():
+                    break
+                continue
+            if item is done:
+                break
+            # Cap each upsert request by vector count and by JSON size
+            for vector in item:
+                vector_bytes = len(json.dumps(vector))
+                if batch and (len(batch) >= max_batch_vectors or batch_bytes + vector_bytes > max_batch_bytes):
+                    added += commit(batch)
+                    batch, batch_bytes = [], 0
+                batch.append(vector)
+                batch_bytes += vector_bytes
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    if batch:
+        added += commit(batch)
+
+    ids = list(seen)
+    removed = sorted(manifest.stored(source) - set(ids))
+    for start in range(0, len(removed), 1000):
+        vector_store.delete(removed[start:start + 1000], namespace=namespace)
+    if keyword_index is not None:
+        for chunk_id in removed:
+            keyword_index.remove(chunk_id)
+
+    manifest.sources[source] = ids
+    clear_checkpoint(checkpoint, source)
+    return {"added": added, "removed": len(removed), "unchanged": len(ids) - added}
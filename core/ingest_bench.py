@@ -0,0 +1,200 @@
+"""Ingestion throughput benchmark: chunk -> embed -> upsert over the sample corpus.
+
+Runs `ingest_chunks` exactly as the notebook does, with the deterministic
+fake embedder and the in-memory index from core.fakes, over
+linkedin_posts.csv, linkedin_posts.txt and synthetic copies scaled 10x and
+100x (each copy's lines are tagged so no chunk is deduplicated away). Each
+case runs in a fresh process so peak RSS is its own. Stage times are busy
+seconds inside each stage; the stages overlap, so the largest one is the
+bottleneck and their sum can exceed the wall time.
+
+    python -m core.ingest_bench --scales 1,10,100 --output ingest-bench.json
+"""
+import argparse
+import csv
+import datetime
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+from core.bm25 import BM25Index
+from core.embedding_engine import EmbeddingEngine
+from core.fakes import FakeBedrock, FakeVectorStore, Latency
+from core.ingest import IngestManifest, ingest_chunks, iter_file_chunks
+
+DATASETS = {"csv": "linkedin_posts.csv", "txt": "linkedin_posts.txt"}
+
+
+class StageTimer:
+    """Accumulates busy seconds per stage across the pipeline's threads."""
+
+    def __init__(self):
+        self.seconds = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def iterate(self, stage, iterable):
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(stage, time.perf_counter() - started)
+                return
+            self.add(stage, time.perf_counter() - started)
+            yield item
+
+    def wrap(self, stage, target, *methods):
+        """Proxy `target`, timing calls to `methods` and forwarding everything else."""
+        timer = self
+
+        class Timed:
+            def __getattr__(self, name):
+                attribute = getattr(target, name)
+                if name not in methods:
+                    return attribute
+
+                def timed(*args, **kwargs):
+                    started = time.perf_counter()
+                    try:
+                        return attribute(*args, **kwargs)
+                    finally:
+                        timer.add(stage, time.perf_counter() - started)
+                return timed
+
+        return Timed()
+
+
+def scaled_copy(path, scale, workdir):
+    """Write `scale` copies of the dataset with every line tagged by its copy number."""
+    if scale == 1:
+        return path
+    name, ext = os.path.splitext(os.path.basename(path))
+    target = os.path.join(workdir, f"{name}-{scale}x{ext}")
+    if ext == ".csv":
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        with open(target, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            for copy in range(scale):
+                for row in rows:
+                    writer.writerow({**row, "content": _tag(row["content"], copy)})
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        with open(target, "w", encoding="utf-8") as f:
+            for copy in range(scale):
+                f.write(_tag(text, copy) + "\n\n")
+    return target
+
+
+def _tag(text, copy):
+    return "\n".join(f"{line} [{copy}]" if line.strip() else line for line in text.split("\n"))
+
+
+def iter_csv_chunks(path, splitter):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            if row.get("content", "").strip():
+                yield from splitter.split_text(row["content"])
+
+
+def run_case(case):
+    """Ingest one dataset file from scratch and return its measurements."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=case["chunk_size"], chunk_overlap=case["chunk_overlap"])
+    timer = StageTimer()
+    engine = EmbeddingEngine(FakeBedrock(Latency(case["embed_latency"], 0.0)), concurrency=case["concurrency"])
+    vector_store = FakeVectorStore()
+    keyword_index = BM25Index() if case["bm25"] else None
+    if case["path"].endswith(".csv"):
+        chunks = iter_csv_chunks(case["path"], splitter)
+    else:
+        chunks = iter_file_chunks(case["path"], splitter)
+
+    started = time.perf_counter()
+    with engine:
+        summary = ingest_chunks(
+            "bench", case["path"], timer.iterate("chunk", chunks),
+            timer.wrap("embed", engine, "gather"),
+            timer.wrap("upsert", vector_store, "upsert", "delete"),
+            IngestManifest(),
+            namespace="bench",
+            embed_batch=case["embed_batch"],
+            max_batch_vectors=case["max_batch_vectors"],
+            keyword_index=timer.wrap("bm25", keyword_index, "add", "remove") if keyword_index is not None else None
+        )
+    wall = time.perf_counter() - started
+    return {
+        "case": case["name"],
+        "file_bytes": os.path.getsize(case["path"]),
+        "chunks": summary["added"],
+        "wall_s": wall,
+        "chunks_per_sec": summary["added"] / wall if wall else 0.0,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages_s": {stage: round(seconds, 4) for stage, seconds in sorted(timer.seconds.items())},
+        "vectors_stored": vector_store.count("bench"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--datasets", default="csv,txt", help="comma-separated subset of: csv, txt")
+    parser.add_argument("--scales", default="1,10,100", help="comma-separated corpus multipliers")
+    parser.add_argument("--data-dir", default=".", help="directory holding the linkedin_posts files")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--embed-batch", type=int, default=32)
+    parser.add_argument("--max-batch-vectors", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8, help="embedding worker threads")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="simulated seconds per embedding call")
+    parser.add_argument("--no-bm25", dest="bm25", action="store_false", help="skip keyword index maintenance")
+    parser.add_argument("--output", default="ingest-bench-results.json")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="ingest-bench-")
+    cases = []
+    for dataset in args.datasets.split(","):
+        source = os.path.join(args.data_dir, DATASETS[dataset])
+        for scale in (int(value) for value in args.scales.split(",")):
+            cases.append({
+                "name": f"{dataset}-{scale}x", "path": scaled_copy(source, scale, workdir),
+                "chunk_size": args.chunk_size, "chunk_overlap": args.chunk_overlap,
+                "embed_batch": args.embed_batch, "max_batch_vectors": args.max_batch_vectors,
+                "concurrency": args.concurrency, "embed_latency": args.embed_latency, "bm25": args.bm25,
+            })
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for case in cases:
+        # A fresh process per case keeps peak RSS from carrying over
+        with context.Pool(1) as pool:
+            result = pool.apply(run_case, (case,))
+        results.append(result)
+        stages = "  ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result["stages_s"].items())
+        print(f"{result['case']:10} {result['chunks']:7d} chunks  {result['wall_s']:7.2f}s  "
+              f"{result['chunks_per_sec']:9.1f} chunks/s  {result['peak_rss_mb']:7.1f} MB  {stages}")
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "config": vars(args),
+            "results": results,
+        }, f, indent=4)
+    print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
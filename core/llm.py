@@ -0,0 +1,50 @@
+"""Prompt formatting and token streaming for the Llama 3 chat model on Bedrock."""
+import time
+
+LLAMA3_MODEL_ID = "meta.llama3-70b-instruct-v1:0"
+MAX_GEN_LEN = 512
+
+
+def format_llama3_prompt(system, messages):
+    """Render a system prompt and chat messages into the Llama 3 instruct template.
+
+    `messages` is a list of {"role": "user" | "assistant", "content": str} dicts
+    in conversation order. The prompt ends with an open assistant header so the
+    model continues as the assistant.
+    """
+    parts = ["<|begin_of_text|>"]
+    if system:
+        parts.append(f"<|start_header_id|>system<|end_header_id|>\n\n{system}<|eot_id|>")
+    for message in messages:
+        role = "user" if message["role"] == "user" else "assistant"
+        parts.append(f"<|start_header_id|>{role}<|end_header_id|>\n\n{message['content']}<|eot_id|>")
+    parts.append("<|start_header_id|>assistant<|end_header_id|>\n\n")
+    return "".join(parts)
+
+
+class TimedStream:
+    """Wrap a token iterator and record time-to-first-token and total time.
+
+    Timings are measured from `started` (a `time.perf_counter()` value, by
+    default the moment of construction), so pass the time the visitor's
+    message arrived to get end-to-end numbers. `ttft` and `total` stay None
+    until the first token / the end of the stream.
+    """
+
+    def __init__(self, tokens, started=None):
+        self._tokens = tokens
+        self.started = time.perf_counter() if started is None else started
+        self.ttft = None
+        self.total = None
+        self.text = ""
+
+    def __iter__(self):
+        for token in self._tokens:
+            if not token:
+                continue
+            if self.ttft is None:
+                self.ttft = time.perf_counter() - self.started
+            self.text += token
+            yield token
+        self.total = time.perf_counter() - self.started
+
@@ -0,0 +1,251 @@
+"""Load generator for the chat pipeline, run against local stand-ins.
+
+Simulated visitor sessions drive `call_langchain_with_chat_memory` exactly
+as the chat page does, with core.fakes in place of Bedrock embedding,
+Bedrock generation and the vector index. The caches, FAQ index and BM25
+index are the real ones, in a scratch working directory, so the numbers
+include their cost. Results (throughput, end-to-end latency and
+time-to-first-token percentiles, error counts, with replies shed by admission
+control counted as errors["shed"]) are written as JSON; pass a
+previous result as --baseline to compare runs and fail on regressions.
+--opener makes every session start with the same question, like the burst
+after a creator shares their link.
+
+    python -m core.loadtest --sessions 200 --concurrency 32 --turns 3 \\
+        --ttft 0.4 --token-interval 0.02 --llm-rps 20 --output results.json
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from core.admission import ADMISSION_SHED_MESSAGE, get_admission_controller
+from core.bm25 import BM25Index, bm25_index_path, tokenize
+from core.chat_pipeline import call_langchain_with_chat_memory
+from core.embeddings import get_embedding_cache
+from core.fakes import FakeBedrock, FakeLLM, FakeVectorStore, Latency, fake_embedding
+from core.metrics import get_metrics
+from core.singleflight import get_single_flight
+from core.vector_store import creator_namespace
+
+
+def percentiles(values):
+    """Nearest-rank p50/p95/p99 plus mean and max, in seconds."""
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99),
+            "mean": sum(ordered) / len(ordered), "max": ordered[-1]}
+
+
+def load_corpus(path, chunk_chars=1000, size=None):
+    """Chunks of the sample posts, or synthetic text if the file is missing."""
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        chunks = [text[start:start + chunk_chars] for start in range(0, len(text), chunk_chars)]
+    else:
+        words = ["growth", "product", "team", "hiring", "startup", "design", "sales", "users", "data", "market"]
+        chunks = [" ".join(random.choice(words) for _ in range(150)) for _ in range(200)]
+    while size and len(chunks) < size:
+        chunks += chunks[:size - len(chunks)]
+    return chunks[:size] if size else chunks
+
+
+def seed_creator(creator, chunks, vector_store):
+    """Index the corpus for `creator` in the fake vector store and a real BM25 index."""
+    keyword_index = BM25Index()
+    vectors = []
+    for i, text in enumerate(chunks):
+        doc_id = f"{creator}#loadtest#{i}"
+        vectors.append({"id": doc_id, "values": fake_embedding(text), "metadata": {"text": text}})
+        keyword_index.add(doc_id, text, "loadtest")
+    for start in range(0, len(vectors), 100):
+        vector_store.upsert(vectors[start:start + 100], namespace=creator_namespace(creator))
+    os.makedirs(os.path.dirname(bm25_index_path(creator)), exist_ok=True)
+    keyword_index.save(bm25_index_path(creator))
+
+
+def make_questions(chunks, count, rng):
+    topics = sorted({token for text in chunks for token in tokenize(text) if len(token) > 4})
+    templates = ["What do you think about {}?", "How did you get started with {}?",
+                 "Any advice on {} for beginners?", "Can you tell me more about {}?"]
+    return [rng.choice(templates).format(rng.choice(topics)) for _ in range(count)]
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.ttfts = []
+        self.tokens = 0
+        self.errors = Counter()
+
+    def success(self, stream, tokens):
+        with self._lock:
+            self.latencies.append(stream.total)
+            if stream.ttft is not None:
+                self.ttfts.append(stream.ttft)
+            self.tokens += tokens
+
+    def failure(self, error, code=None):
+        code = code or getattr(error, "response", {}).get("Error", {}).get("Code")
+        with self._lock:
+            self.errors[code or type(error).__name__] += 1
+
+
+def run_session(creator, questions, turns, think_time, clients, recorder, rng, opener=None):
+    session = {}
+    history = [{"role": "assistant", "content": "Hi! How can I help you today?"}]
+    for turn in range(turns):
+        question = opener if opener and turn == 0 else rng.choice(questions)
+        history.append({"role": "user", "content": question})
+        try:
+            tokens = 0
+            for _ in call_langchain_with_chat_memory(history, question, creator, session, **clients):
+                tokens += 1
+            stream = session.pop("last_stream")
+            if stream.text == ADMISSION_SHED_MESSAGE:
+                # Turned away by admission control: not a served answer
+                recorder.failure(None, "shed")
+                history.pop()
+            else:
+                recorder.success(stream, tokens)
+                history.append({"role": "assistant", "content": stream.text})
+        except Exception as e:
+            recorder.failure(e)
+            history.pop()
+        if think_time:
+            time.sleep(think_time * rng.uniform(0.5, 1.5))
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    corpus = load_corpus(os.path.abspath(args.corpus), size=args.corpus_size)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="loadtest-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)  # caches and per-creator indexes use relative data/ paths
+
+    bedrock = FakeBedrock(Latency(args.embed_latency, args.jitter), rate=args.embed_rps)
+    llm = FakeLLM(Latency(args.ttft, args.jitter), args.token_interval, args.tokens, rate=args.llm_rps)
+    vector_store = FakeVectorStore(Latency(args.query_latency, args.jitter))
+    seed_creator(args.creator, corpus, vector_store)
+    questions = make_questions(corpus, args.distinct_questions, rng)
+    clients = {"bedrock": bedrock, "vector_store": vector_store, "llm": llm}
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(run_session, args.creator, questions, args.turns, args.think_time, clients,
+                                   recorder, random.Random(rng.random()), args.opener)
+                   for _ in range(args.sessions)]
+        for future in futures:
+            future.result()
+    duration = time.perf_counter() - started
+
+    requests = len(recorder.latencies) + sum(recorder.errors.values())
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "duration_s": duration,
+        "requests": requests,
+        "succeeded": len(recorder.latencies),
+        "errors": dict(recorder.errors),
+        "throughput_rps": len(recorder.latencies) / duration if duration else 0.0,
+        "tokens_per_s": recorder.tokens / duration if duration else 0.0,
+        "latency_s": percentiles(recorder.latencies),
+        "ttft_s": percentiles(recorder.ttfts),
+        "backends": {
+            "embed_calls": bedrock.calls,
+            "embed_throttled": bedrock.limiter.throttled,
+            "llm_calls": llm.calls,
+            "llm_throttled": llm.limiter.throttled,
+        },
+        "embedding_cache": get_embedding_cache().stats(),
+        "admission": get_admission_controller().stats(),
+        "single_flight": get_single_flight().stats(),
+        "stages_s": get_metrics().summary(args.creator),
+    }
+
+
+def compare(result, baseline, max_regression):
+    """Print changes against a previous result; return False if one regressed too far."""
+    ok = True
+    checks = [("throughput_rps", None, False)] + [
+        (metric, q, True) for metric in ("latency_s", "ttft_s") for q in ("p50", "p95", "p99")
+    ]
+    for metric, q, lower_is_better in checks:
+        new = result[metric][q] if q else result[metric]
+        old = baseline[metric][q] if q else baseline[metric]
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        regressed = change > max_regression if lower_is_better else change < -max_regression
+        ok = ok and not regressed
+        label = f"{metric}.{q}" if q else metric
+        print(f"{label:18} {old:10.4f} -> {new:10.4f} ({change:+.1%}){'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sessions", type=int, default=50, help="simulated visitor sessions")
+    parser.add_argument("--concurrency", type=int, default=16, help="sessions running at once")
+    parser.add_argument("--turns", type=int, default=3, help="questions per session")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between turns (s)")
+    parser.add_argument("--creator", default="loadtest")
+    parser.add_argument("--corpus", default="linkedin_posts.txt", help="text to index for retrieval")
+    parser.add_argument("--corpus-size", type=int, default=None, help="repeat/trim the corpus to this many chunks")
+    parser.add_argument("--distinct-questions", type=int, default=200, help="question pool size (repeats hit caches)")
+    parser.add_argument("--opener", default=None, help="first question of every session (a shared-link burst)")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Titan embedding call (s)")
+    parser.add_argument("--query-latency", type=float, default=0.03, help="vector index query (s)")
+    parser.add_argument("--ttft", type=float, default=0.4, help="generation time to first token (s)")
+    parser.add_argument("--token-interval", type=float, default=0.02, help="time between generated tokens (s)")
+    parser.add_argument("--tokens", type=int, default=64, help="generated tokens per answer")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency jitter as a fraction of the mean")
+    parser.add_argument("--embed-rps", type=float, default=None, help="embedding calls/s before throttling")
+    parser.add_argument("--llm-rps", type=float, default=None, help="generation calls/s before throttling")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None, help="scratch directory (default: a new temp dir)")
+    parser.add_argument("--output", default="loadtest-results.json", help="where to write the JSON result")
+    parser.add_argument("--baseline", default=None, help="previous result to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="allowed relative slowdown vs the baseline before exiting non-zero")
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+    result = run(args)
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=4)
+
+    print(f"{result['succeeded']}/{result['requests']} requests in {result['duration_s']:.1f}s "
+          f"({result['throughput_rps']:.1f} req/s), errors: {result['errors'] or 'none'}")
+    for metric in ("latency_s", "ttft_s"):
+        stats = result[metric]
+        if stats["p50"] is not None:
+            print(f"{metric:10} p50 {stats['p50']:.3f}  p95 {stats['p95']:.3f}  p99 {stats['p99']:.3f}")
+    print(f"Wrote {output}")
+    if baseline is not None and not compare(result, baseline, args.max_regression):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
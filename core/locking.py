@@ -0,0 +1,21 @@
+"""Advisory file locks shared by the Streamlit processes on one host."""
+import fcntl
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def file_lock(path, shared=False):
+    """Hold an flock on `path` (created if missing) for the block.
+
+    Writers take it exclusive; readers that must not observe a half-applied
+    update take it shared.
+    """
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
@@ -0,0 +1,227 @@
+"""Per-stage latency histograms for the chat pipeline.
+
+Each process aggregates spans into fixed-bucket histograms keyed by
+(creator, stage) and a background thread writes them every
+METRICS_FLUSH_SECONDS to data/metrics/<host>-<pid>.json. Readers (the
+dashboard's Performance tab, `python -m core.metrics`) merge all snapshot
+files updated within METRICS_MAX_AGE_SECONDS, so every Streamlit process on
+the host is covered without shared memory.
+
+    python -m core.metrics                 # print Prometheus text format
+    python -m core.metrics --serve 9464    # serve it at http://host:9464/metrics
+"""
+import argparse
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_DIR = os.getenv("METRICS_DIR", "data/metrics")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "10"))
+METRICS_MAX_AGE_SECONDS = float(os.getenv("METRICS_MAX_AGE_SECONDS", str(24 * 3600)))
+STAGE_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+# Stages in pipeline order, for display
+STAGES = ["embed", "faq_match", "answer_cache", "retrieval", "prompt", "queue", "first_token", "generation", "ttft",
+          "total", "coalesced", "save"]
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    def __init__(self, counts=None, total=0.0):
+        self.counts = counts or [0] * (len(STAGE_BUCKETS) + 1)  # last bucket is +Inf
+        self.sum = total
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def observe(self, seconds):
+        for i, bound in enumerate(STAGE_BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += seconds
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        return self
+
+    def percentile(self, q):
+        """Estimate the q-quantile by interpolating inside its bucket."""
+        total = self.count
+        if not total:
+            return None
+        threshold = q * total
+        running = 0
+        for i, count in enumerate(self.counts):
+            if count and running + count >= threshold:
+                if i == len(STAGE_BUCKETS):
+                    return STAGE_BUCKETS[-1]
+                lower = STAGE_BUCKETS[i - 1] if i else 0.0
+                return lower + (STAGE_BUCKETS[i] - lower) * (threshold - running) / count
+            running += count
+        return STAGE_BUCKETS[-1]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}  # (creator, stage) -> Histogram
+
+    def observe(self, creator, stage, seconds):
+        if seconds is None:
+            return
+        with self._lock:
+            self.histograms.setdefault((creator, stage), Histogram()).observe(seconds)
+
+    @contextmanager
+    def span(self, creator, stage):
+        """Time the block as one observation of `stage` (also when it raises)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(creator, stage, time.perf_counter() - started)
+
+    def merge(self, other):
+        with self._lock:
+            for key, histogram in other.histograms.items():
+                self.histograms.setdefault(key, Histogram()).merge(histogram)
+        return self
+
+    def to_json(self):
+        with self._lock:
+            return [{"creator": creator, "stage": stage, "counts": list(histogram.counts), "sum": histogram.sum}
+                    for (creator, stage), histogram in self.histograms.items()]
+
+    @classmethod
+    def from_json(cls, entries):
+        registry = cls()
+        for entry in entries:
+            registry.histograms[(entry["creator"], entry["stage"])] = Histogram(entry["counts"], entry["sum"])
+        return registry
+
+    def summary(self, creator):
+        """Rows of {stage, count, p50, p95, p99, mean} for one creator, in pipeline order."""
+        with self._lock:
+            found = {stage: histogram for (owner, stage), histogram in self.histograms.items() if owner == creator}
+        order = STAGES + sorted(set(found) - set(STAGES))
+        return [{
+            "stage": stage,
+            "count": found[stage].count,
+            "p50": found[stage].percentile(0.50),
+            "p95": found[stage].percentile(0.95),
+            "p99": found[stage].percentile(0.99),
+            "mean": found[stage].sum / found[stage].count,
+        } for stage in order if stage in found and found[stage].count]
+
+    def render_prometheus(self):
+        lines = [
+            "# HELP clone_stage_seconds Latency of chat pipeline stages.",
+            "# TYPE clone_stage_seconds histogram",
+        ]
+        with self._lock:
+            items = sorted(self.histograms.items())
+        for (creator, stage), histogram in items:
+            labels = f'creator="{_escape(creator)}",stage="{_escape(stage)}"'
+            running = 0
+            for bound, count in zip(STAGE_BUCKETS + ["+Inf"], histogram.counts):
+                running += count
+                lines.append(f'clone_stage_seconds_bucket{{{labels},le="{bound}"}} {running}')
+            lines.append(f"clone_stage_seconds_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"clone_stage_seconds_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class ProcessMetrics(MetricsRegistry):
+    """This process's registry, periodically written to its snapshot file."""
+
+    def __init__(self, directory=METRICS_DIR, flush_interval=METRICS_FLUSH_SECONDS):
+        super().__init__()
+        self.path = os.path.join(directory, f"{socket.gethostname()}-{os.getpid()}.json")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(flush_interval,), name="metrics-flush", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def flush(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"updated": time.time(), "histograms": self.to_json()}, f)
+        os.replace(tmp_path, self.path)
+
+    def _run(self, flush_interval):
+        while not self._stop.wait(flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Metrics flush failed, will retry")
+
+
+def load_metrics(directory=METRICS_DIR, max_age=METRICS_MAX_AGE_SECONDS):
+    """Merge the snapshot files of every process that flushed within `max_age`."""
+    merged = MetricsRegistry()
+    if not os.path.isdir(directory):
+        return merged
+    cutoff = time.time() - max_age
+    for name in os.listdir(directory):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name), "r") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue  # removed or replaced while listing
+        if snapshot["updated"] >= cutoff:
+            merged.merge(MetricsRegistry.from_json(snapshot["histograms"]))
+    return merged
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = ProcessMetrics()
+        return _metrics
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = load_metrics().render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export chat pipeline stage latencies in Prometheus format.")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="serve /metrics on this port instead of printing")
+    args = parser.parse_args()
+    if args.serve:
+        ThreadingHTTPServer(("", args.serve), _MetricsHandler).serve_forever()
+    else:
+        print(load_metrics().render_prometheus(), end="")
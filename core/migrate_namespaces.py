@@ -0,0 +1,73 @@
+"""Move a creator's vectors from the shared namespace into their own.
+
+Vectors ingested before per-creator namespaces live in a default namespace
+under several id schemes: `str(hash(chunk))` (the original notebook),
+`{user_email}-{hash(chunk)}` (the original Lambda) and `owner#source#text`
+(core.ingest). All of them carry the uploader's e-mail in the `user_email`
+metadata field, so vectors are selected by that (or, for core.ingest ids
+without it, by the `owner#` prefix). The run lists every id in the source
+namespace, fetches a page at a time, copies the selected vectors into
+creator_namespace(creator) and then deletes them from the source, so an
+interrupted run can simply be started again. Ids are unchanged, so ingest
+manifests stay valid and nothing is re-embedded.
+
+Older uploads went to the "user-posts" index while chat reads PINECONE_INDEX;
+pass --source-index to move them across:
+
+    python -m core.migrate_namespaces OWNER CREATOR [--source-index user-posts] [--dry-run] [--keep]
+"""
+import argparse
+import os
+
+from core.vector_store import PineconeVectorStore, creator_namespace, get_vector_store
+
+
+def belongs_to(vector, owner):
+    return vector["metadata"].get("user_email") == owner or vector["id"].startswith(f"{owner}#")
+
+
+def migrate_creator(vector_store, owner, creator, source_namespace="", dry_run=False, keep=False,
+                    target_store=None):
+    """Return how many vectors were (or, with dry_run, would be) moved.
+
+    Vectors are read from `vector_store` and written to `target_store`
+    (default: the same store).
+    """
+    target_store = target_store or vector_store
+    target = creator_namespace(creator)
+    moved = 0
+    # Deleting while paging would shift the listing, so collect ids first
+    pages = list(vector_store.list_ids(namespace=source_namespace))
+    for ids in pages:
+        vectors = [vector for vector in vector_store.fetch(ids, namespace=source_namespace)
+                   if belongs_to(vector, owner)]
+        if dry_run or not vectors:
+            moved += len(vectors)
+            continue
+        for vector in vectors:
+            vector["metadata"]["creator"] = creator
+        target_store.upsert(vectors, namespace=target)
+        if not keep:
+            vector_store.delete([vector["id"] for vector in vectors], namespace=source_namespace)
+        moved += len(vectors)
+    return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("owner", help="e-mail the vectors were ingested under (their user_email metadata)")
+    parser.add_argument("creator", help="creator username whose namespace receives the vectors")
+    parser.add_argument("--source-namespace", default="", help="namespace to move from (default: the default one)")
+    parser.add_argument("--source-index", default=None,
+                        help="Pinecone index to move from (default: the configured PINECONE_INDEX)")
+    parser.add_argument("--dry-run", action="store_true", help="only count the vectors that would move")
+    parser.add_argument("--keep", action="store_true", help="copy without deleting from the source")
+    args = parser.parse_args()
+    target_store = get_vector_store()
+    source_store = target_store
+    if args.source_index:
+        from pinecone import Pinecone
+        source_store = PineconeVectorStore(Pinecone(api_key=os.getenv("PINECONE_API")).Index(args.source_index))
+    moved = migrate_creator(source_store, args.owner, args.creator, args.source_namespace,
+                            dry_run=args.dry_run, keep=args.keep, target_store=target_store)
+    print(f"{'Would move' if args.dry_run else 'Moved'} {moved} vectors to {creator_namespace(args.creator)}")
@@ -0,0 +1,239 @@
+"""Incremental near-duplicate clustering of visitor questions.
+
+Questions are normalized (case, punctuation, whitespace), so trivial variants
+collapse immediately. Remaining paraphrases are grouped with MinHash over
+character 3-grams and LSH banding: a new question only compares against
+clusters that share a band bucket, so the cost per question is constant no
+matter how many questions a creator has. Optionally, questions whose query
+embedding is already cached are also merged into one of the most popular
+clusters by cosine similarity; their cached vectors are loaded once per
+update into one normalized matrix, so each question is scored with a single
+matrix product.
+
+State lives in a per-creator SQLite file and is advanced from the same
+positions (legacy offset + event cursor) as the question counts.
+"""
+import json
+import os
+import re
+import sqlite3
+import zlib
+
+import numpy as np
+
+from core.locking import file_lock
+from core.question_stats import read_new_questions
+
+NUM_PERM = 96
+BANDS = 32  # 3 rows per band: ~99% of pairs at 0.5 Jaccard become candidates, ~23% at 0.2
+MINHASH_THRESHOLD = float(os.getenv("QUESTION_CLUSTER_THRESHOLD", "0.5"))
+SEMANTIC_CLUSTERING = os.getenv("QUESTION_CLUSTER_SEMANTIC", "0") == "1"
+SEMANTIC_THRESHOLD = float(os.getenv("QUESTION_CLUSTER_SEMANTIC_THRESHOLD", "0.9"))
+SEMANTIC_CANDIDATES = 500
+
+_rng = np.random.RandomState(1)
+_A = _rng.randint(0, 1 << 62, size=NUM_PERM, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+_B = _rng.randint(0, 1 << 62, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def normalize_question(text):
+    return " ".join(_PUNCTUATION.sub(" ", text.casefold()).split())
+
+
+def minhash(normalized):
+    """MinHash signature of the character 3-grams of a normalized question."""
+    padded = f" {normalized} "
+    shingles = {padded[i:i + 3] for i in range(max(1, len(padded) - 2))}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # Multiply-shift hashing: (a * x + b) mod 2^64, keeping the high 32 bits
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) >> np.uint64(32)).min(axis=1)
+
+
+def _bucket_keys(signature):
+    """One LSH bucket key per band: the band number in the high bits, a hash of its rows below."""
+    rows = NUM_PERM // BANDS
+    return [(band << 32) | zlib.crc32(signature[band * rows:(band + 1) * rows].tobytes()) for band in range(BANDS)]
+
+
+def question_clusters_path(creator):
+    return f"data/creators/{creator}/question_clusters.db"
+
+
+class QuestionClusters:
+    def __init__(self, creator):
+        self.creator = creator
+        self._signatures = {}  # cluster id -> MinHash signature of its first question
+        self._semantic_index = None  # (cluster ids, normalized vectors) for the current update
+        path = question_clusters_path(creator)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS clusters (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                representative TEXT NOT NULL,
+                representative_count INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                signature BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS clusters_count ON clusters (count);
+            CREATE TABLE IF NOT EXISTS members (
+                normalized TEXT PRIMARY KEY,
+                cluster_id INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                count INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS buckets (
+                bucket INTEGER NOT NULL,
+                cluster_id INTEGER NOT NULL,
+                PRIMARY KEY (bucket, cluster_id)
+            );
+            CREATE TABLE IF NOT EXISTS state (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+
+    def _state(self, name, default):
+        row = self._db.execute("SELECT value FROM state WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_state(self, name, value):
+        self._db.execute("INSERT OR REPLACE INTO state (name, value) VALUES (?, ?)", (name, json.dumps(value)))
+
+    def _signature(self, cluster_id):
+        signature = self._signatures.get(cluster_id)
+        if signature is None:
+            row = self._db.execute("SELECT signature FROM clusters WHERE id = ?", (cluster_id,)).fetchone()
+            signature = self._signatures[cluster_id] = np.frombuffer(row[0], dtype=np.uint64)
+        return signature
+
+    def _find_cluster(self, signature, question):
+        keys = _bucket_keys(signature)
+        candidates = [row[0] for row in self._db.execute(
+            f"SELECT DISTINCT cluster_id FROM buckets WHERE bucket IN ({', '.join('?' * len(keys))})", keys
+        )]
+        best = None
+        if candidates:
+            similarities = (np.stack([self._signature(c) for c in candidates]) == signature).mean(axis=1)
+            if similarities.max() >= MINHASH_THRESHOLD:
+                best = candidates[int(np.argmax(similarities))]
+        if best is None and SEMANTIC_CLUSTERING:
+            best = self._find_semantic_cluster(question)
+        return best
+
+    def _load_semantic_index(self):
+        """Cluster ids and row-normalized cached vectors of the most asked clusters' representatives."""
+        from core.embeddings import get_embedding_cache
+
+        rows = self._db.execute(
+            "SELECT id, representative FROM clusters ORDER BY count DESC LIMIT ?", (SEMANTIC_CANDIDATES,)
+        ).fetchall()
+        vectors = get_embedding_cache().peek_many([representative for _, representative in rows])
+        ids = [cluster_id for (cluster_id, _), vector in zip(rows, vectors) if vector is not None]
+        if not ids:
+            return [], None
+        matrix = np.asarray([vector for vector in vectors if vector is not None], dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        return ids, matrix
+
+    def _find_semantic_cluster(self, question):
+        # Only uses embeddings the chat page already paid for; never calls Bedrock
+        from core.embeddings import get_embedding_cache
+
+        vector = get_embedding_cache().peek(question)
+        if vector is None:
+            return None
+        ids, matrix = self._semantic_index or self._load_semantic_index()
+        if matrix is None:
+            return None
+        query = np.asarray(vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        similarities = matrix @ query
+        best = int(np.argmax(similarities))
+        return ids[best] if similarities[best] >= SEMANTIC_THRESHOLD else None
+
+    def add(self, question, count=1):
+        """Assign one question to a cluster, creating a cluster if none is close."""
+        question = question.strip()
+        normalized = normalize_question(question)
+        if not normalized:
+            return
+        member = self._db.execute(
+            "SELECT cluster_id, count FROM members WHERE normalized = ?", (normalized,)
+        ).fetchone()
+        if member is not None:
+            cluster_id, member_count = member[0], member[1] + count
+            self._db.execute("UPDATE members SET count = ? WHERE normalized = ?", (member_count, normalized))
+        else:
+            signature = minhash(normalized)
+            cluster_id = self._find_cluster(signature, question)
+            if cluster_id is None:
+                cluster_id = self._db.execute(
+                    "INSERT INTO clusters (representative, representative_count, count, signature) "
+                    "VALUES (?, 0, 0, ?)", (question, signature.tobytes())
+                ).lastrowid
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO buckets (bucket, cluster_id) VALUES (?, ?)",
+                    [(key, cluster_id) for key in _bucket_keys(signature)]
+                )
+            member_count = count
+            self._db.execute(
+                "INSERT INTO members (normalized, cluster_id, text, count) VALUES (?, ?, ?, ?)",
+                (normalized, cluster_id, question, member_count)
+            )
+        # The most asked wording represents the cluster
+        self._db.execute(
+            "UPDATE clusters SET count = count + ?, "
+            "representative = CASE WHEN ? > representative_count "
+            "THEN (SELECT text FROM members WHERE normalized = ?) ELSE representative END, "
+            "representative_count = MAX(representative_count, ?) WHERE id = ?",
+            (count, member_count, normalized, member_count, cluster_id)
+        )
+
+    def update(self):
+        """Cluster questions logged since the last update."""
+        with file_lock(f"data/creators/{self.creator}/.question_clusters.lock"):
+            position = self._state("position", {"legacy_offset": 0, "events_cursor": None})
+            questions, legacy_offset, events_cursor = read_new_questions(
+                self.creator, position["legacy_offset"], position["events_cursor"]
+            )
+            if not questions:
+                return
+            with self._db:
+                self._db.execute("BEGIN IMMEDIATE")
+                # Semantic candidates are the top clusters as of the start of this update
+                if SEMANTIC_CLUSTERING:
+                    self._semantic_index = self._load_semantic_index()
+                try:
+                    for question, _ in questions:
+                        self.add(question)
+                finally:
+                    self._semantic_index = None
+                self._set_state("position", {"legacy_offset": legacy_offset, "events_cursor": events_cursor})
+
+    def top(self, k=10):
+        """[(representative question, count, number of distinct wordings)] by count."""
+        return [tuple(row) for row in self._db.execute(
+            "SELECT representative, count, (SELECT COUNT(*) FROM members WHERE cluster_id = clusters.id) "
+            "FROM clusters ORDER BY count DESC LIMIT ?", (k,)
+        )]
+
+    def group(self, question_counts, k=10):
+        """Aggregate exact (question, count) pairs by cluster, e.g. for a time window."""
+        totals = {}
+        for question, count in question_counts:
+            row = self._db.execute(
+                "SELECT clusters.id, clusters.representative FROM members JOIN clusters "
+                "ON clusters.id = members.cluster_id WHERE members.normalized = ?",
+                (normalize_question(question),)
+            ).fetchone()
+            key = (row[0], row[1]) if row else (None, question)
+            totals[key] = totals.get(key, 0) + count
+        ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(representative, count) for (_, representative), count in ranked]
+
+
+def get_question_clusters(creator):
+    """Open the creator's clusters and fold in new questions."""
+    clusters = QuestionClusters(creator)
+    clusters.update()
+    return clusters
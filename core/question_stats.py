@@ -0,0 +1,165 @@
+"""Incrementally maintained "most asked questions" counts per creator.
+
+State lives in data/creators/<user>/question_stats.json together with the
+read positions in the legacy chat_history.txt (a byte offset) and in the
+event log (a cursor), so each dashboard load only parses conversations that
+arrived since the previous one. Lifetime counts are kept in a Space-Saving
+sketch of bounded size; the last QUESTION_WINDOW_DAYS days are also counted
+per day for the 7/30-day views.
+"""
+import datetime
+import heapq
+import json
+import os
+
+from core.event_log import read_new_events
+from core.locking import file_lock
+
+QUESTION_SKETCH_SIZE = int(os.getenv("QUESTION_SKETCH_SIZE", "2000"))
+QUESTION_WINDOW_DAYS = 30
+
+
+def question_stats_path(creator):
+    return f"data/creators/{creator}/question_stats.json"
+
+
+def read_new_questions(creator, legacy_offset=0, events_cursor=None):
+    """Return ([(question, ts or None), ...], legacy_offset, events_cursor) for
+    user messages logged after the given positions.
+
+    chat_history.txt has no timestamps, so its questions come with ts None.
+    """
+    questions = []
+    path = f"data/creators/{creator}/chat_history.txt"
+    if os.path.exists(path) and os.path.getsize(path) > legacy_offset:
+        with open(path, "rb") as f:
+            f.seek(legacy_offset)
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.decode("utf-8", errors="replace").split("\n"):
+            if line.startswith("User:"):
+                questions.append((line[5:], None))
+        legacy_offset += len(complete)
+
+    events, events_cursor = read_new_events(creator, events_cursor)
+    questions.extend((event.get("text", ""), event["ts"]) for event in events if event.get("role") == "user")
+    return questions, legacy_offset, events_cursor
+
+
+class SpaceSaving:
+    """Top-k heavy hitters in at most `capacity` counters.
+
+    Exact while fewer than `capacity` distinct questions have been seen;
+    beyond that, a new question replaces the smallest counter and inherits
+    its count, which bounds the overestimate by that count. The smallest
+    counter comes from a min-heap of (count, item) entries; increments push a
+    new entry and outdated ones are skipped when popped, so each add costs
+    O(log capacity).
+    """
+
+    def __init__(self, capacity=QUESTION_SKETCH_SIZE, counts=None):
+        self.capacity = capacity
+        self.counts = counts or {}
+        self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_smallest(self):
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return item
+
+    def add(self, item, count=1):
+        if item in self.counts or len(self.counts) < self.capacity:
+            self.counts[item] = self.counts.get(item, 0) + count
+        else:
+            smallest = self._pop_smallest()
+            self.counts[item] = self.counts.pop(smallest) + count
+        heapq.heappush(self._heap, (self.counts[item], item))
+        # Outdated entries pile up for repeatedly asked questions; compact now and then
+        if len(self._heap) > 4 * max(self.capacity, len(self.counts)):
+            self._rebuild_heap()
+
+    def top(self, k):
+        return heapq.nlargest(k, self.counts.items(), key=lambda item: item[1])
+
+
+class QuestionStats:
+    def __init__(self, creator, state=None):
+        state = state or {}
+        self.creator = creator
+        self.legacy_offset = state.get("legacy_offset", 0)
+        self.events_cursor = state.get("events_cursor")
+        self.lifetime = SpaceSaving(counts=state.get("lifetime"))
+        self.daily = state.get("daily", {})
+
+    @classmethod
+    def load(cls, creator):
+        path = question_stats_path(creator)
+        if not os.path.exists(path):
+            return cls(creator)
+        with open(path, "r") as f:
+            return cls(creator, json.load(f))
+
+    def save(self):
+        path = question_stats_path(self.creator)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "legacy_offset": self.legacy_offset,
+                "events_cursor": self.events_cursor,
+                "lifetime": self.lifetime.counts,
+                "daily": self.daily,
+            }, f)
+        os.replace(tmp_path, path)
+
+    def _count(self, question, day=None):
+        question = question.strip()
+        if not question:
+            return
+        self.lifetime.add(question)
+        if day is not None:
+            bucket = self.daily.setdefault(day, {})
+            bucket[question] = bucket.get(question, 0) + 1
+
+    def _prune(self):
+        cutoff = (datetime.date.today() - datetime.timedelta(days=QUESTION_WINDOW_DAYS)).strftime("%Y-%m-%d")
+        for day in [day for day in self.daily if day < cutoff]:
+            del self.daily[day]
+
+    def update(self):
+        questions, self.legacy_offset, self.events_cursor = read_new_questions(
+            self.creator, self.legacy_offset, self.events_cursor
+        )
+        for question, ts in questions:
+            day = datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d") if ts is not None else None
+            self._count(question, day)
+        self._prune()
+
+    def top(self, k=10, days=None):
+        """Most asked questions overall, or over the last `days` days (k=None for all)."""
+        if days is None:
+            return self.lifetime.top(k)
+        cutoff = (datetime.date.today() - datetime.timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        counts = {}
+        for day, bucket in self.daily.items():
+            if day >= cutoff:
+                for question, count in bucket.items():
+                    counts[question] = counts.get(question, 0) + count
+        if k is None:
+            return sorted(counts.items(), key=lambda item: item[1], reverse=True)
+        return heapq.nlargest(k, counts.items(), key=lambda item: item[1])
+
+
+def get_question_stats(creator):
+    """Load the creator's stats, fold in new conversations and persist them."""
+    with file_lock(f"data/creators/{creator}/.question_stats.lock"):
+        stats = QuestionStats.load(creator)
+        position = (stats.legacy_offset, stats.events_cursor, len(stats.daily))
+        stats.update()
+        if (stats.legacy_offset, stats.events_cursor, len(stats.daily)) != position:
+            stats.save()
+    return stats
@@ -0,0 +1,85 @@
+"""Rendered-chart cache for the dashboard.
+
+Charts are keyed on (creator, chart, data version), where the version is
+something that changes whenever the underlying data does: the source file's
+(mtime_ns, size) or a digest of the plotted rows. A hit returns the stored
+PNG without touching matplotlib; a miss draws the figure, rasterizes it and
+closes it at once so no figure outlives the rerun. Entries are evicted
+least-recently-used beyond CHART_CACHE_ENTRIES, and a new version of a
+chart replaces the old one immediately.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+
+CHART_CACHE_ENTRIES = int(os.getenv("CHART_CACHE_ENTRIES", "128"))
+
+
+def file_version(path):
+    """Data version of a source file: (mtime_ns, size), or None if missing."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def data_version(rows):
+    """Data version of in-memory rows (anything with a stable repr)."""
+    return hashlib.sha1(repr(rows).encode("utf-8")).hexdigest()
+
+
+class ChartCache:
+    def __init__(self, max_entries=CHART_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (creator, chart) -> (version, png bytes)
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, creator, chart, version, draw):
+        """Return PNG bytes for `chart`, calling `draw()` only if `version` changed."""
+        key = (creator, chart)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        fig = draw()
+        try:
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png", bbox_inches="tight")
+        finally:
+            plt.close(fig)
+        png = buffer.getvalue()
+
+        with self._lock:
+            self._entries[key] = (version, png)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return png
+
+    def invalidate(self, creator):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == creator]:
+                del self._entries[key]
+
+
+_chart_cache = None
+_chart_cache_lock = threading.Lock()
+
+
+def get_chart_cache():
+    global _chart_cache
+    with _chart_cache_lock:
+        if _chart_cache is None:
+            _chart_cache = ChartCache()
+        return _chart_cache
@@ -0,0 +1,174 @@
+"""Process-wide registry of warm clients (Bedrock, Pinecone, the LLM).
+
+Streamlit re-runs page scripts on every interaction, but imported modules
+live for the whole process. Clients created here are built once, on first
+use, and shared by every session, so their HTTP connection pools and TLS
+sessions are reused across reruns. Calls made through `with_reconnect` (or
+`with_client`) rebuild a client whose connection dropped or whose
+credentials expired and retry once; other errors (throttling, validation)
+are raised as they are, keeping the warm client. A client with a health
+check that sat unused for RESOURCE_IDLE_CHECK_SECONDS is checked before it
+is handed out again, so a broken client doesn't stay cached until the
+process exits.
+"""
+import logging
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from core.llm import LLAMA3_MODEL_ID, MAX_GEN_LEN
+
+load_dotenv()
+
+AWS_REGION = os.getenv("AWS_DEFAULT_REGION", "us-east-1")
+PINECONE_INDEX = os.getenv("PINECONE_INDEX", "document-store")
+MAX_POOL_CONNECTIONS = int(os.getenv("MAX_POOL_CONNECTIONS", "50"))
+RESOURCE_IDLE_CHECK_SECONDS = float(os.getenv("RESOURCE_IDLE_CHECK_SECONDS", "300"))
+
+# Exception class names (botocore, urllib3/Pinecone, builtins) that a fresh client can fix
+RECONNECT_ERRORS = {"ConnectionError", "EndpointConnectionError", "ConnectionClosedError", "ConnectTimeoutError",
+                    "NewConnectionError", "ProtocolError", "MaxRetryError", "NoCredentialsError"}
+
+logger = logging.getLogger(__name__)
+
+
+def needs_reconnect(error):
+    """True for a dropped connection or expired credentials, anywhere in the exception chain."""
+    while error is not None:
+        if any(cls.__name__ in RECONNECT_ERRORS for cls in type(error).__mro__):
+            return True
+        code = (getattr(error, "response", None) or {}).get("Error", {}).get("Code", "")
+        if code.startswith("ExpiredToken"):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class ResourceRegistry:
+    """Lazily created shared resources with optional health checks.
+
+    `factory` builds the resource; `health_check`, if given, receives the
+    resource and should raise (or return False) when it is unusable.
+    `depends_on` names resources the factory uses, so resetting one of them
+    also resets this one.
+    """
+
+    def __init__(self, idle_check_seconds=RESOURCE_IDLE_CHECK_SECONDS):
+        self.idle_check_seconds = idle_check_seconds
+        self._factories = {}
+        self._health_checks = {}
+        self._dependents = {}
+        self._instances = {}
+        self._last_used = {}
+        self._lock = threading.RLock()
+
+    def register(self, name, factory, health_check=None, depends_on=()):
+        with self._lock:
+            self._factories[name] = factory
+            self._health_checks[name] = health_check
+            for dependency in depends_on:
+                self._dependents.setdefault(dependency, set()).add(name)
+            self._instances.pop(name, None)
+
+    def _idle(self, name):
+        return (self._health_checks.get(name) is not None
+                and time.monotonic() - self._last_used.get(name, 0.0) > self.idle_check_seconds)
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None and not self._idle(name):
+            self._last_used[name] = time.monotonic()
+            return instance
+        with self._lock:
+            if name in self._instances and self._idle(name):
+                # Unused for a while; its connection may have gone stale
+                self.check(name)
+            if name not in self._instances:
+                self._instances[name] = self._factories[name]()
+            self._last_used[name] = time.monotonic()
+            return self._instances[name]
+
+    def reset(self, name):
+        """Drop the current instance (and its dependents) so the next `get` reconnects."""
+        with self._lock:
+            self._instances.pop(name, None)
+            for dependent in self._dependents.get(name, ()):
+                self.reset(dependent)
+
+    def check(self, name):
+        """Run the health check on the current instance and drop it if unhealthy; return the health."""
+        health_check = self._health_checks.get(name)
+        instance = self._instances.get(name)
+        if health_check is None or instance is None:
+            return True
+        try:
+            healthy = health_check(instance) is not False
+        except Exception as e:
+            logger.warning("Health check failed for %s: %s", name, e)
+            healthy = False
+        if not healthy:
+            self.reset(name)
+        return healthy
+
+    def with_reconnect(self, name, fn):
+        """Call fn(resource); if the connection or credentials failed, reconnect once and retry."""
+        try:
+            return fn(self.get(name))
+        except Exception as e:
+            if not needs_reconnect(e):
+                raise
+            logger.warning("Call through %s failed, reconnecting once: %s", name, e)
+            self.reset(name)
+            return fn(self.get(name))
+
+
+def _bedrock():
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "bedrock-runtime",
+        region_name=AWS_REGION,
+        config=Config(max_pool_connections=MAX_POOL_CONNECTIONS, tcp_keepalive=True)
+    )
+
+
+def _pinecone_index():
+    from pinecone import Pinecone
+
+    return Pinecone(api_key=os.getenv("PINECONE_API")).Index(PINECONE_INDEX)
+
+
+def _llm():
+    from langchain.llms.bedrock import Bedrock
+
+    return Bedrock(
+        client=registry.get("bedrock"),
+        model_id=LLAMA3_MODEL_ID,
+        model_kwargs={"max_gen_len": MAX_GEN_LEN},
+        streaming=True
+    )
+
+
+registry = ResourceRegistry()
+registry.register("bedrock", _bedrock)
+registry.register("pinecone_index", _pinecone_index, health_check=lambda index: index.describe_index_stats())
+registry.register("llm", _llm, depends_on=("bedrock",))
+
+
+def get_bedrock():
+    return registry.get("bedrock")
+
+
+def get_pinecone_index():
+    return registry.get("pinecone_index")
+
+
+def with_client(name, client, fn):
+    """Call fn(client) for an injected client, else fn(shared `name` client) with one reconnect."""
+    if client is not None:
+        return fn(client)
+    return registry.with_reconnect(name, fn)
+
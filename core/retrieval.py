@@ -0,0 +1,33 @@
+"""Hybrid retrieval: dense vector search fused with BM25 keyword search."""
+from concurrent.futures import ThreadPoolExecutor
+
+RRF_K = 60
+
+# Only the in-process BM25 leg runs here; the vector query stays on the
+# caller's thread so concurrent chats never queue behind each other for it
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="keyword-search")
+
+
+def reciprocal_rank_fusion(result_lists, top_k, k=RRF_K):
+    """Merge ranked Match lists; each list contributes 1 / (k + rank) per item.
+
+    Items are identified by id, falling back to their text so the same chunk
+    found under different ids is counted once.
+    """
+    scores = {}
+    matches = {}
+    for results in result_lists:
+        for rank, match in enumerate(results, start=1):
+            key = match.metadata.get("text") or match.id
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            matches.setdefault(key, match)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [matches[key] for key in ranked]
+
+
+def hybrid_search(vector_store, keyword_index, query_text, vector, top_k=3, filter=None, namespace="",
+                  candidates=10):
+    """Run the vector query and the keyword search in parallel and fuse them."""
+    sparse = _executor.submit(keyword_index.search, query_text, top_k=candidates)
+    dense = vector_store.query(vector, top_k=candidates, filter=filter, namespace=namespace)
+    return reciprocal_rank_fusion([dense, sparse.result()], top_k)
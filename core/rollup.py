@@ -0,0 +1,290 @@
+"""Incremental usage rollups from the chat event log.
+
+Each run folds only events after the stored cursor into per-creator daily and
+hourly buckets: chats (first turns), messages, unique visitors (one
+HyperLogLog per day, so memory is constant per bucket) and a fixed
+log-scale latency histogram for percentiles. The dashboard reads the
+precomputed series that `export` writes next to the rollup state:
+
+    usage_history.csv    daily chats/messages/unique_users + latency p50/p95/p99
+    usage_weekly.csv     ISO weeks, unique users from merged HyperLogLogs
+    usage_monthly.csv    calendar months, likewise
+    usage_hours.csv      messages, chats, unique users and latency p50/p95 per
+                         hour of day, last 30 days
+    usage_retention.csv  share of chats that reach turn 1..10+
+
+Every file is written with its header row even when there is no data yet.
+
+Run `python -m core.rollup` to roll up every creator, e.g. from cron.
+"""
+import base64
+import csv
+import datetime
+import hashlib
+import json
+import math
+import os
+
+from core.event_log import read_new_events
+from core.locking import file_lock
+
+HLL_PRECISION = 10  # 1024 registers, ~3% standard error
+LATENCY_BOUNDS = [round(0.05 * 1.25 ** i, 3) for i in range(40)]  # 50 ms .. ~300 s
+HOURLY_RETENTION_DAYS = 30
+HISTORY_DAYS = 90
+MAX_TURN = 10
+
+FIELDS = {
+    "usage_history.csv": ["date", "chats", "messages", "unique_users", "latency_p50", "latency_p95", "latency_p99"],
+    "usage_weekly.csv": ["week_label", "week", "chats", "messages", "unique_users"],
+    "usage_monthly.csv": ["month", "chats", "messages", "unique_users"],
+    "usage_hours.csv": ["hour", "messages", "chats", "unique_users", "latency_p50", "latency_p95"],
+    "usage_retention.csv": ["turn", "chats", "share"],
+}
+
+
+class HyperLogLog:
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = registers if registers is not None else bytearray(self.m)
+
+    def add(self, value):
+        x = int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+        index = x >> (64 - self.precision)
+        rest = x & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        for i, rank in enumerate(other.registers):
+            if rank > self.registers[i]:
+                self.registers[i] = rank
+        return self
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)  # linear counting for small sets
+        return int(round(estimate))
+
+    def to_json(self):
+        # Sparse form while few registers are set (typical for a single day)
+        nonzero = [[i, rank] for i, rank in enumerate(self.registers) if rank]
+        if len(nonzero) < self.m // 8:
+            return {"sparse": nonzero}
+        return {"dense": base64.b64encode(bytes(self.registers)).decode("ascii")}
+
+    @classmethod
+    def from_json(cls, data):
+        hll = cls()
+        if data is None:
+            return hll
+        if "dense" in data:
+            hll.registers = bytearray(base64.b64decode(data["dense"]))
+        else:
+            for i, rank in data["sparse"]:
+                hll.registers[i] = rank
+        return hll
+
+
+def latency_percentile(histogram, q):
+    """Upper bound of the histogram bucket containing the q-quantile (seconds)."""
+    total = sum(histogram)
+    if not total:
+        return None
+    threshold = q * total
+    running = 0
+    for i, count in enumerate(histogram):
+        running += count
+        if running >= threshold:
+            return LATENCY_BOUNDS[min(i, len(LATENCY_BOUNDS) - 1)]
+    return LATENCY_BOUNDS[-1]
+
+
+def _latency_bucket(seconds):
+    for i, bound in enumerate(LATENCY_BOUNDS):
+        if seconds <= bound:
+            return i
+    return len(LATENCY_BOUNDS) - 1
+
+
+def rollup_path(creator):
+    return f"data/creators/{creator}/usage_rollup.json"
+
+
+class UsageRollup:
+    def __init__(self, creator, state=None):
+        state = state or {}
+        self.creator = creator
+        self.cursor = state.get("cursor")
+        self.daily = state.get("daily", {})
+        self.hourly = state.get("hourly", {})
+
+    @classmethod
+    def load(cls, creator):
+        path = rollup_path(creator)
+        if not os.path.exists(path):
+            return cls(creator)
+        with open(path, "r") as f:
+            return cls(creator, json.load(f))
+
+    def save(self):
+        path = rollup_path(self.creator)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"cursor": self.cursor, "daily": self.daily, "hourly": self.hourly}, f)
+        os.replace(tmp_path, path)
+
+    def update(self):
+        """Fold events logged since the last run into the buckets; return how many."""
+        events, self.cursor = read_new_events(self.creator, self.cursor)
+        visitors = {}  # (buckets, key) -> HyperLogLog, decoded once per run
+        for event in events:
+            moment = datetime.datetime.fromtimestamp(event["ts"])
+            day = moment.strftime("%Y-%m-%d")
+            hour = moment.strftime("%Y-%m-%d %H")
+            daily = self.daily.setdefault(day, {
+                "chats": 0, "messages": 0, "visitors": None,
+                "latency": [0] * len(LATENCY_BOUNDS), "turns": [0] * MAX_TURN
+            })
+            hourly = self.hourly.setdefault(hour, {"chats": 0, "messages": 0})
+            # Hourly buckets from before visitors/latency were tracked
+            hourly.setdefault("visitors", None)
+            hourly.setdefault("latency", [0] * len(LATENCY_BOUNDS))
+            daily["messages"] += 1
+            hourly["messages"] += 1
+            if event.get("role") == "user":
+                turn = event.get("turn") or 1
+                daily["turns"][min(turn, MAX_TURN) - 1] += 1
+                if turn == 1:
+                    daily["chats"] += 1
+                    hourly["chats"] += 1
+                if event.get("session_id"):
+                    for slot, bucket in ((("daily", day), daily), (("hourly", hour), hourly)):
+                        if slot not in visitors:
+                            visitors[slot] = HyperLogLog.from_json(bucket["visitors"])
+                        visitors[slot].add(event["session_id"])
+            elif event.get("latency") is not None:
+                index = _latency_bucket(event["latency"])
+                daily["latency"][index] += 1
+                hourly["latency"][index] += 1
+        for (buckets, key), hll in visitors.items():
+            getattr(self, buckets)[key]["visitors"] = hll.to_json()
+
+        cutoff = (datetime.datetime.now() - datetime.timedelta(days=HOURLY_RETENTION_DAYS)).strftime("%Y-%m-%d %H")
+        for hour in [hour for hour in self.hourly if hour < cutoff]:
+            del self.hourly[hour]
+        return len(events)
+
+    def _unique(self, days):
+        hll = HyperLogLog()
+        for day in days:
+            if day in self.daily:
+                hll.merge(HyperLogLog.from_json(self.daily[day]["visitors"]))
+        return hll.count()
+
+    def export(self):
+        """Write the precomputed CSV series the dashboard reads."""
+        directory = f"data/creators/{self.creator}"
+        today = datetime.date.today()
+        days = [(today - datetime.timedelta(days=i)).strftime("%Y-%m-%d") for i in range(HISTORY_DAYS - 1, -1, -1)]
+        empty = {"chats": 0, "messages": 0, "visitors": None, "latency": [0] * len(LATENCY_BOUNDS)}
+
+        history = []
+        for day in days:
+            bucket = self.daily.get(day, empty)
+            history.append({
+                "date": day,
+                "chats": bucket["chats"],
+                "messages": bucket["messages"],
+                "unique_users": HyperLogLog.from_json(bucket["visitors"]).count(),
+                "latency_p50": latency_percentile(bucket["latency"], 0.50),
+                "latency_p95": latency_percentile(bucket["latency"], 0.95),
+                "latency_p99": latency_percentile(bucket["latency"], 0.99),
+            })
+
+        weeks, months = {}, {}
+        for day in sorted(self.daily):
+            date = datetime.date.fromisoformat(day)
+            iso = date.isocalendar()
+            weeks.setdefault((f"{iso[0]}-W{iso[1]:02d}", iso[1]), []).append(day)
+            months.setdefault(day[:7], []).append(day)
+        weekly = [{
+            "week_label": label,
+            "week": number,
+            "chats": sum(self.daily[day]["chats"] for day in members),
+            "messages": sum(self.daily[day]["messages"] for day in members),
+            "unique_users": self._unique(members),
+        } for (label, number), members in sorted(weeks.items())]
+        monthly = [{
+            "month": month,
+            "chats": sum(self.daily[day]["chats"] for day in members),
+            "messages": sum(self.daily[day]["messages"] for day in members),
+            "unique_users": self._unique(members),
+        } for month, members in sorted(months.items())]
+
+        hours = [{"hour": hour, "messages": 0, "chats": 0} for hour in range(24)]
+        hour_visitors = [HyperLogLog() for _ in range(24)]
+        hour_latency = [[0] * len(LATENCY_BOUNDS) for _ in range(24)]
+        for key, bucket in self.hourly.items():
+            hour = int(key[-2:])
+            hours[hour]["messages"] += bucket["messages"]
+            hours[hour]["chats"] += bucket["chats"]
+            hour_visitors[hour].merge(HyperLogLog.from_json(bucket.get("visitors")))
+            for i, count in enumerate(bucket.get("latency", [])):
+                hour_latency[hour][i] += count
+        for hour, row in enumerate(hours):
+            row["unique_users"] = hour_visitors[hour].count()
+            row["latency_p50"] = latency_percentile(hour_latency[hour], 0.50)
+            row["latency_p95"] = latency_percentile(hour_latency[hour], 0.95)
+
+        turns = [0] * MAX_TURN
+        for bucket in self.daily.values():
+            for i, count in enumerate(bucket["turns"]):
+                turns[i] += count
+        retention = [{
+            "turn": f"{i + 1}+" if i + 1 == MAX_TURN else str(i + 1),
+            "chats": count,
+            "share": round(count / turns[0], 4) if turns[0] else 0.0,
+        } for i, count in enumerate(turns)]
+
+        for name, rows in (("usage_history.csv", history), ("usage_weekly.csv", weekly),
+                           ("usage_monthly.csv", monthly), ("usage_hours.csv", hours),
+                           ("usage_retention.csv", retention)):
+            path = os.path.join(directory, name)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=FIELDS[name])
+                writer.writeheader()
+                writer.writerows(rows)
+            os.replace(tmp_path, path)
+
+
+def run_rollup(creator, force_export=False):
+    """Roll up new events for one creator and refresh the exported series."""
+    with file_lock(f"data/creators/{creator}/.usage_rollup.lock"):
+        rollup = UsageRollup.load(creator)
+        new_events = rollup.update()
+        history_path = f"data/creators/{creator}/usage_history.csv"
+        # Re-export at least daily so the zero-filled window keeps moving; the
+        # first run also replaces any placeholder usage_history.csv
+        stale = (
+            not os.path.exists(rollup_path(creator))
+            or not os.path.exists(history_path)
+            or datetime.date.fromtimestamp(os.path.getmtime(history_path)) < datetime.date.today()
+        )
+        if new_events or stale or force_export:
+            rollup.save()
+            rollup.export()
+    return rollup
+
+
+if __name__ == "__main__":
+    for name in sorted(os.listdir("data/creators")):
+        if os.path.isdir(os.path.join("data/creators", name)):
+            run_rollup(name, force_export=True)
+            print(f"Rolled up {name}")
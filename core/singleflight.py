@@ -0,0 +1,124 @@
+"""Single-flight coalescing of identical in-flight token streams.
+
+The first request for a key (the leader) runs the producer; requests for
+the same key that arrive while it is running (followers) attach to it and
+receive the same tokens as they are produced, from the beginning. Once the
+flight finishes the key is free again, so later requests start their own
+run (by then the answer cache usually serves them). If the leader's
+consumer goes away mid-stream, the run is finished in the background for
+the followers.
+"""
+import threading
+
+
+class Flight:
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.followers = 0
+        self._cond = threading.Condition()
+
+    def publish(self, token):
+        with self._cond:
+            self.tokens.append(token)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.done = True
+            self.error = error
+            self._cond.notify_all()
+
+    def subscribe(self):
+        """Yield every token of the flight, waiting for new ones until it ends."""
+        position = 0
+        while True:
+            with self._cond:
+                while position == len(self.tokens) and not self.done:
+                    self._cond.wait()
+                tokens = self.tokens[position:]
+                done, error = self.done, self.error
+            position += len(tokens)
+            yield from tokens
+            if done and position == len(self.tokens):
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.flights = 0
+        self.coalesced = 0
+
+    def stream(self, key, produce):
+        """Yield the tokens of `produce()`; concurrent calls with an equal key share one run."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+                self.flights += 1
+            else:
+                flight.followers += 1
+                self.coalesced += 1
+        if not leader:
+            yield from flight.subscribe()
+            return
+
+        source = produce()
+        try:
+            for token in source:
+                flight.publish(token)
+                yield token
+        except GeneratorExit:
+            # The leader's visitor left (e.g. a Streamlit rerun); finish the run
+            # for whoever attached, or stop it if nobody did
+            with self._lock:
+                abandon = flight.followers == 0
+                if abandon:
+                    self._flights.pop(key, None)
+            if abandon:
+                source.close()
+                flight.finish(GeneratorExit())
+            else:
+                threading.Thread(target=self._drain, args=(key, flight, source), daemon=True).start()
+            raise
+        except BaseException as e:
+            self._finish(key, flight, e)
+            raise
+        self._finish(key, flight)
+
+    def _drain(self, key, flight, source):
+        try:
+            for token in source:
+                flight.publish(token)
+        except Exception as e:
+            self._finish(key, flight, e)
+            return
+        self._finish(key, flight)
+
+    def _finish(self, key, flight, error=None):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.finish(error)
+
+    def stats(self):
+        with self._lock:
+            return {"flights": self.flights, "coalesced": self.coalesced, "in_flight": len(self._flights)}
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight():
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight()
+        return _single_flight
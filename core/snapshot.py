@@ -0,0 +1,76 @@
+"""Read-once snapshots of per-creator artifacts for page reruns.
+
+`read_artifact` parses a file at most once per (mtime_ns, size) across
+reruns and sessions in this process and hands each caller its own copy, so
+pages can mutate what they get (e.g. convert a date column) without
+corrupting the cache. `Snapshot` memoizes loaders for a single rerun: a
+page builds one at the top of the script, so every helper that asks for
+the profile, settings or usage data during that rerun shares one read.
+Writers call `invalidate_artifact` (and `Snapshot.invalidate`) so their
+own rerun never sees the pre-write value, even on filesystems with coarse
+mtimes.
+"""
+import copy
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+SNAPSHOT_CACHE_ENTRIES = int(os.getenv("SNAPSHOT_CACHE_ENTRIES", "512"))
+
+_artifacts = OrderedDict()  # path -> ((mtime_ns, size), parsed value)
+_artifacts_lock = threading.Lock()
+
+
+def load_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def load_csv(path):
+    return pd.read_csv(path)
+
+
+def read_artifact(path, parse):
+    """Return a private copy of `parse(path)`, reparsing only when the file changed.
+
+    Raises FileNotFoundError if the file does not exist.
+    """
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _artifacts_lock:
+        entry = _artifacts.get(path)
+        if entry is not None and entry[0] == version:
+            _artifacts.move_to_end(path)
+            return copy.deepcopy(entry[1])
+    value = parse(path)
+    with _artifacts_lock:
+        _artifacts[path] = (version, value)
+        _artifacts.move_to_end(path)
+        while len(_artifacts) > SNAPSHOT_CACHE_ENTRIES:
+            _artifacts.popitem(last=False)
+    return copy.deepcopy(value)
+
+
+def invalidate_artifact(*paths):
+    with _artifacts_lock:
+        for path in paths:
+            _artifacts.pop(path, None)
+
+
+class Snapshot:
+    """Per-rerun memo: each named value is loaded at most once."""
+
+    def __init__(self):
+        self._values = {}
+
+    def get(self, name, loader):
+        if name not in self._values:
+            self._values[name] = loader()
+        return self._values[name]
+
+    def invalidate(self, *names):
+        for name in names:
+            self._values.pop(name, None)
@@ -0,0 +1,345 @@
+"""Vector store interface with Pinecone and local (memory-mapped NumPy) backends.
+
+Vectors use Pinecone's upsert shape everywhere:
+{"id": str, "values": [float, ...], "metadata": {...}}. Queries return a list
+of Match objects ordered by descending cosine similarity.
+"""
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+import numpy as np
+
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE", "pinecone")
+LOCAL_VECTOR_ROOT = os.getenv("LOCAL_VECTOR_ROOT", "data/vectors")
+LOCAL_VECTOR_DTYPE = os.getenv("LOCAL_VECTOR_DTYPE", "float32")
+
+Match = namedtuple("Match", ["id", "score", "metadata"])
+
+
+def creator_namespace(creator):
+    """Namespace holding one creator's vectors; ingestion and chat must agree on it."""
+    return f"creator-{creator}"
+
+
+class VectorStore(ABC):
+    """Backends implement every method, so one missing any fails when it is created."""
+
+    @abstractmethod
+    def query(self, vector, top_k=3, filter=None, namespace=""):
+        raise NotImplementedError
+
+    @abstractmethod
+    def upsert(self, vectors, namespace=""):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, ids, namespace=""):
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_ids(self, prefix="", namespace=""):
+        """Yield lists of vector ids starting with `prefix`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def fetch(self, ids, namespace=""):
+        """Return the stored vectors for `ids` in upsert shape (missing ids are skipped)."""
+        raise NotImplementedError
+
+
+class PineconeVectorStore(VectorStore):
+    """Pinecone backend.
+
+    Without an explicit `index` it uses the shared one from core.resources
+    and reconnects once when a call fails.
+    """
+
+    def __init__(self, index=None):
+        self._index = index
+
+    @property
+    def index(self):
+        if self._index is not None:
+            return self._index
+        from core.resources import get_pinecone_index
+        return get_pinecone_index()
+
+    def _call(self, fn):
+        from core.resources import with_client
+        return with_client("pinecone_index", self._index, fn)
+
+    def query(self, vector, top_k=3, filter=None, namespace=""):
+        results = self._call(lambda index: index.query(
+            vector=vector,
+            top_k=top_k,
+            include_metadata=True,
+            filter=filter,
+            namespace=namespace
+        ))
+        return [Match(match.id, match.score, match.metadata or {}) for match in results.matches]
+
+    def upsert(self, vectors, namespace=""):
+        if vectors:
+            self._call(lambda index: index.upsert(vectors=vectors, namespace=namespace))
+
+    def delete(self, ids, namespace=""):
+        if ids:
+            self._call(lambda index: index.delete(ids=list(ids), namespace=namespace))
+
+    def list_ids(self, prefix="", namespace=""):
+        # Id listing is only available on serverless indexes
+        for ids in self.index.list(prefix=prefix or None, namespace=namespace):
+            yield list(ids)
+
+    def fetch(self, ids, namespace=""):
+        if not ids:
+            return []
+        vectors = self._call(lambda index: index.fetch(ids=list(ids), namespace=namespace)).vectors
+        return [{"id": vector.id, "values": list(vector.values), "metadata": dict(vector.metadata or {})}
+                for vector in vectors.values()]
+
+
+def _compare(value, op, expected):
+    if op == "$eq":
+        return value == expected
+    if op == "$ne":
+        return value != expected
+    if op == "$in":
+        return value in expected
+    if op == "$nin":
+        return value not in expected
+    if value is None:
+        return False
+    if op == "$gt":
+        return value > expected
+    if op == "$gte":
+        return value >= expected
+    if op == "$lt":
+        return value < expected
+    if op == "$lte":
+        return value <= expected
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+def matches_filter(metadata, filter):
+    """Evaluate a Pinecone-style metadata filter against one metadata dict."""
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            for op, expected in condition.items():
+                if op == "$exists":
+                    if (key in metadata) != expected:
+                        return False
+                elif key not in metadata or not _compare(metadata[key], op, expected):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class _Namespace:
+    """Vectors of one namespace: a row-major matrix file plus a JSON sidecar.
+
+    Vectors are stored L2-normalized, either as float32 or as int8 scaled by
+    127. Deleted rows are tombstoned (id set to None) and reused by later
+    inserts, so the matrix file only grows with the live corpus.
+    """
+
+    def __init__(self, path, dtype):
+        self.path = path
+        self.meta_path = os.path.join(path, "index.json")
+        self.matrix_path = os.path.join(path, "vectors.bin")
+        self.dtype = dtype
+        self.version = None
+        self.dim = None
+        self.ids = []
+        self.metadata = []
+        self.rows = {}
+        self.matrix = None
+        self.masks = {}
+
+    def load(self):
+        """(Re)load the sidecar and memory map if another writer changed them."""
+        if not os.path.exists(self.meta_path):
+            return
+        stat = os.stat(self.meta_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        if version == self.version:
+            return
+        with open(self.meta_path, "r") as f:
+            meta = json.load(f)
+        self.dtype = meta["dtype"]
+        self.dim = meta["dim"]
+        self.ids = meta["ids"]
+        self.metadata = meta["metadata"]
+        self.rows = {vector_id: row for row, vector_id in enumerate(self.ids) if vector_id is not None}
+        self.matrix = None
+        self.masks = {}
+        if self.ids:
+            self.matrix = np.memmap(self.matrix_path, dtype=self.dtype, mode="r", shape=(len(self.ids), self.dim))
+        self.version = version
+
+    def _encode(self, values):
+        vector = np.asarray(values, dtype=np.float32)
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        if self.dtype == "int8":
+            return np.clip(np.rint(vector * 127), -127, 127).astype(np.int8)
+        return vector
+
+    def write(self, upserts, deletes):
+        self.load()
+        free_rows = [row for row, vector_id in enumerate(self.ids) if vector_id is None]
+        for vector_id in deletes:
+            row = self.rows.pop(vector_id, None)
+            if row is not None:
+                self.ids[row] = None
+                self.metadata[row] = None
+                free_rows.append(row)
+
+        placed = []
+        for vector in upserts:
+            if self.dim is None:
+                self.dim = len(vector["values"])
+            row = self.rows.get(vector["id"])
+            if row is None:
+                row = free_rows.pop() if free_rows else len(self.ids)
+                if row == len(self.ids):
+                    self.ids.append(None)
+                    self.metadata.append(None)
+            self.ids[row] = vector["id"]
+            self.metadata[row] = vector.get("metadata") or {}
+            self.rows[vector["id"]] = row
+            placed.append((row, self._encode(vector["values"])))
+
+        os.makedirs(self.path, exist_ok=True)
+        if placed:
+            self.matrix = None
+            width = self.dim * np.dtype(self.dtype).itemsize
+            needed = len(self.ids) * width
+            with open(self.matrix_path, "ab") as f:
+                if f.tell() < needed:
+                    f.truncate(needed)
+            matrix = np.memmap(self.matrix_path, dtype=self.dtype, mode="r+", shape=(len(self.ids), self.dim))
+            for row, encoded in placed:
+                matrix[row] = encoded
+            matrix.flush()
+            del matrix
+
+        tmp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dim": self.dim, "dtype": self.dtype, "ids": self.ids, "metadata": self.metadata}, f)
+        os.replace(tmp_path, self.meta_path)
+        self.version = None
+        self.load()
+
+    def query(self, vector, top_k, filter, block_rows=65536):
+        self.load()
+        if self.matrix is None or not self.rows:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        if self.dtype == "int8":
+            query = query / 127.0
+
+        # Rows that are deleted or fail the filter score -inf; masks are
+        # reused until the namespace changes on disk
+        mask_key = json.dumps(filter, sort_keys=True)
+        alive = self.masks.get(mask_key)
+        if alive is None:
+            alive = np.fromiter(
+                (vector_id is not None and (filter is None or matches_filter(metadata, filter))
+                 for vector_id, metadata in zip(self.ids, self.metadata)),
+                dtype=bool, count=len(self.ids)
+            )
+            self.masks[mask_key] = alive
+        scores = np.full(len(self.ids), -np.inf, dtype=np.float32)
+        for start in range(0, len(self.ids), block_rows):
+            block = self.matrix[start:start + block_rows]
+            scores[start:start + len(block)] = block @ query
+        scores[~alive] = -np.inf
+
+        k = min(top_k, int(alive.sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [Match(self.ids[row], float(scores[row]), self.metadata[row]) for row in top]
+
+    def fetch(self, ids):
+        self.load()
+        scale = 127.0 if self.dtype == "int8" else 1.0
+        return [{"id": vector_id, "values": (self.matrix[self.rows[vector_id]].astype(np.float32) / scale).tolist(),
+                 "metadata": dict(self.metadata[self.rows[vector_id]])}
+                for vector_id in ids if vector_id in self.rows]
+
+
+class LocalVectorStore(VectorStore):
+    """Brute-force cosine search over memory-mapped matrices, one per namespace.
+
+    Runs fully offline; meant for small and medium creators and for tests.
+    """
+
+    def __init__(self, root=LOCAL_VECTOR_ROOT, dtype=LOCAL_VECTOR_DTYPE):
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"Unsupported local vector dtype: {dtype}")
+        self.root = root
+        self.dtype = dtype
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def _namespace(self, namespace):
+        name = namespace or "_default"
+        if name not in self._namespaces:
+            self._namespaces[name] = _Namespace(os.path.join(self.root, name), self.dtype)
+        return self._namespaces[name]
+
+    def query(self, vector, top_k=3, filter=None, namespace=""):
+        with self._lock:
+            return self._namespace(namespace).query(vector, top_k, filter)
+
+    def upsert(self, vectors, namespace=""):
+        with self._lock:
+            self._namespace(namespace).write(vectors, [])
+
+    def delete(self, ids, namespace=""):
+        with self._lock:
+            self._namespace(namespace).write([], ids)
+
+    def list_ids(self, prefix="", namespace="", page_size=100):
+        with self._lock:
+            space = self._namespace(namespace)
+            space.load()
+            ids = [vector_id for vector_id in space.ids if vector_id is not None and vector_id.startswith(prefix)]
+        for start in range(0, len(ids), page_size):
+            yield ids[start:start + page_size]
+
+    def fetch(self, ids, namespace=""):
+        with self._lock:
+            return self._namespace(namespace).fetch(ids)
+
+
+_local_store = None
+_local_lock = threading.Lock()
+
+
+def get_vector_store(pinecone_index=None):
+    """Return the configured backend (VECTOR_STORE=pinecone|local).
+
+    Without an explicit `pinecone_index` the shared one from core.resources
+    is used, reconnecting once when a call fails.
+    """
+    global _local_store
+    if VECTOR_STORE_BACKEND == "local":
+        with _local_lock:
+            if _local_store is None:
+                _local_store = LocalVectorStore()
+            return _local_store
+    return PineconeVectorStore(pinecone_index)
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import os
+from core.creator_store import get_creator_store
 
 # Setup page configuration
 st.set_page_config(
@@ -32,14 +33,12 @@ def login_creator(username, password):
     # In a real app, you would validate against a secure database
     # For this demo, we'll use a simple CSV file
     try:
-        if os.path.exists("data/creators.csv"):
-            df = pd.read_csv("data/creators.csv")
-            creator = df[df["username"] == username]
-            if not creator.empty and creator.iloc[0]["password"] == password:
-                st.session_state.logged_in = True
-                st.session_state.current_creator = username
-                st.switch_page("pages/dashboard.py")
-                return True
+        creator = get_creator_store().get(username)
+        if creator is not None and creator["password"] == password:
+            st.session_state.logged_in = True
+            st.session_state.current_creator = username
+            st.switch_page("pages/dashboard.py")
+            return True
         return False
     except Exception as e:
         st.error(f"Login error: {e}")
@@ -51,21 +50,11 @@ def signup_creator(username, name, password):
         # Create creators directory if it doesn't exist
         os.makedirs("data/creators", exist_ok=True)
         
-        # Check if creators.csv exists, if not create it
-        if not os.path.exists("data/creators.csv"):
-            pd.DataFrame(columns=["username", "name", "password"]).to_csv("data/creators.csv", index=False)
-        
-        # Check if username already exists
-        df = pd.read_csv("data/creators.csv")
-        if username in df["username"].values:
+        # Add new creator (a single-row insert; fails if the username exists)
+        if not get_creator_store().create(username, name, password):
             st.error("Username already exists. Please choose another one.")
             return False
         
-        # Add new creator
-        new_creator = pd.DataFrame([[username, name, password]], columns=["username", "name", "password"])
-        df = pd.concat([df, new_creator], ignore_index=True)
-        df.to_csv("data/creators.csv", index=False)
-        
         # Create creator's directory
         os.makedirs(f"data/creators/{username}", exist_ok=True)
         
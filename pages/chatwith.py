@@ -1,26 +1,18 @@
 import streamlit as st
 import random
 import time
-import pandas as pd
 import os
+import uuid
 from urllib.parse import parse_qs
-import boto3
-from langchain.llms.bedrock import Bedrock
-from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferMemory
-from langchain_core.messages import HumanMessage, SystemMessage
-import json
 from dotenv import load_dotenv
-from pinecone import Pinecone, ServerlessSpec
+from core.chat_pipeline import call_langchain_with_chat_memory
+from core.counters import get_live_counters
+from core.creator_store import get_creator_store
+from core.context import estimate_tokens
+from core.event_log import append_events
+from core.metrics import get_metrics
 
 load_dotenv()
-pinecone_api = os.getenv("PINECONE_API")
-
-session = boto3.Session(profile_name="personal", region_name="us-east-1")
-bedrock = boto3.client("bedrock-runtime")
-pc = Pinecone(api_key=pinecone_api)
-index_name = "document-store"
-pinecone_index = pc.Index(index_name)
 
 # Setup page configuration
 st.set_page_config(
@@ -50,29 +42,38 @@ def go_to_dashboard(username):
 # Helper functions
 def get_user_data(username):
     try:
-        df = pd.read_csv("data/creators.csv")
-        user_data = df[df["username"] == username]
-        if not user_data.empty:
-            return user_data.iloc[0]
-        return None
+        return get_creator_store().get(username)
     except Exception as e:
         st.error(f"Error reading user data: {e}")
         return None
 
-def save_chat_history(username, messages):
+def save_chat_history(username, messages, session_id=None, turn=None):
     try:
         # Create directory if it doesn't exist
         os.makedirs("data/creators", exist_ok=True)
         os.makedirs(f"data/creators/{username}", exist_ok=True)
         
-        # Save messages to a file
-        with open(f"data/creators/{username}/chat_history.txt", "a") as f:
-            for message in messages:
-                if message["role"] == "user":
-                    f.write(f"User: {message['content']}\n")
-                else:
-                    f.write(f"Assistant: {message['content']}\n")
-            f.write("\n---\n\n")
+        # Save messages as structured events (one JSON record per message)
+        save_started = time.perf_counter()
+        events = []
+        for message in messages:
+            event = {
+                "session_id": session_id,
+                "turn": turn,
+                "role": message["role"],
+                "text": message["content"],
+                "tokens": estimate_tokens(message["content"]),
+            }
+            if message["role"] == "assistant":
+                event["latency"] = message.get("latency")
+                event["ttft"] = message.get("ttft")
+            events.append(event)
+        append_events(username, events)
+        get_metrics().observe(username, "save", time.perf_counter() - save_started)
+        
+        # Dashboard header counters; buffered and merged into stats.csv in the background
+        get_live_counters().record(username, messages=len(messages), chats=1 if turn == 1 else 0,
+                                   session_id=session_id)
     except Exception as e:
         st.error(f"Error saving chat history: {e}")
 
@@ -88,13 +89,6 @@ def response_generator(user_name):
         yield word + " "
         time.sleep(0.05)
 
-def llama2_model():
-    llm = Bedrock(
-        model_id="meta.llama3-70b-instruct-v1:0",
-        model_kwargs={'max_gen_len': 512}
-    )
-    return llm
-
 # def call_langchain_with_chat_memory(chat_history, user_input):
 #     # Initialize LLM and memory
 #     llm = llama2_model()
@@ -122,54 +116,6 @@ def llama2_model():
 #         yield word + " "
 #         time.sleep(0.05)
 
-def call_langchain_with_chat_memory(chat_history, user_input, username):
-    # 1. Generate embedding for user input
-    response = bedrock.invoke_model(
-        body=json.dumps({"inputText": user_input}),
-        modelId="amazon.titan-embed-text-v2:0",
-        contentType="application/json"
-    )
-    input_embedding = json.loads(response['body'].read()).get("embedding")
-    
-    # 2. Query Pinecone with username filter
-    results = pinecone_index.query(
-        vector=input_embedding,
-        top_k=3,
-        include_metadata=True,
-        filter={
-            "user_id": {"$eq": username},
-            "$and": [{"source": {"$exists": True}}]
-        }
-    )
-    
-    # 3. Build context from matches
-    context = "\n".join([match.metadata["text"] for match in results.matches])
-    
-    # 4. Initialize LLM with context-aware prompt
-    llm = llama2_model()
-    memory = ConversationBufferMemory(return_messages=True)
-    
-    # Load history with context
-    memory.chat_memory.add_message(SystemMessage(content=f"Relevant context: {context}"))
-    for message in chat_history:
-        if message["role"] == "user":
-            memory.chat_memory.add_user_message(message["content"])
-        else:
-            memory.chat_memory.add_ai_message(message["content"])
-    
-    # 5. Create conversation chain
-    conversation = ConversationChain(
-        llm=llm,
-        memory=memory,
-        verbose=False
-    )
-    
-    # 6. Generate and stream response
-    response = conversation.predict(input=user_input)
-    for word in response.split():
-        yield word + " "
-        time.sleep(0.05)
-
 # Get creator from URL query parameter
 creator_username = st.query_params.get("creator", None)
 
@@ -199,6 +145,10 @@ if creator_username:
         # Show creator info in header instead of sidebar
         st.write(f"Creator: **{user_name}**")
         
+        # One id per visitor session, used to group events in the chat log
+        if "session_id" not in st.session_state:
+            st.session_state.session_id = uuid.uuid4().hex
+        
         # Initialize chat history
         if "messages" not in st.session_state:
             st.session_state.messages = [
@@ -220,13 +170,32 @@ if creator_username:
         
             # Display assistant response in chat message container
             with st.chat_message("assistant"):
-                response = st.write_stream(call_langchain_with_chat_memory(st.session_state.messages, prompt, creator_username))
-            # Add assistant response to chat history
-            st.session_state.messages.append({"role": "assistant", "content": response})
+                # Shown while the reply waits for a generation slot during traffic spikes
+                queue_status = st.empty()
+                
+                def show_queue_position(position):
+                    if position is None:
+                        queue_status.empty()
+                    else:
+                        queue_status.info(f"⏳ {user_name}'s clone is busy. You're #{position} in line...")
+                
+                response = st.write_stream(call_langchain_with_chat_memory(
+                    st.session_state.messages, prompt, creator_username, st.session_state,
+                    on_wait=show_queue_position
+                ))
+            # Add assistant response to chat history, keeping the stream timings
+            # (time-to-first-token is the latency visitors actually feel)
+            stream = st.session_state.pop("last_stream", None)
+            assistant_message = {"role": "assistant", "content": response}
+            if stream is not None:
+                assistant_message["ttft"] = stream.ttft
+                assistant_message["latency"] = stream.total
+            st.session_state.messages.append(assistant_message)
             
             # Save chat history
-            save_chat_history(creator_username, [{"role": "user", "content": prompt}, 
-                                      {"role": "assistant", "content": response}])
+            turn = sum(1 for message in st.session_state.messages if message["role"] == "user")
+            save_chat_history(creator_username, [{"role": "user", "content": prompt}, assistant_message],
+                              session_id=st.session_state.session_id, turn=turn)
     else:
         st.error(f"Creator '{creator_username}' not found.")
         if st.button("Back to Home"):
@@ -2,11 +2,20 @@ import streamlit as st
 import pandas as pd
 import os
 import uuid
-from collections import Counter
 import datetime
 import json
 import matplotlib.pyplot as plt
-import numpy as np
+from core.answer_cache import get_answer_cache
+from core.counters import get_live_counters, read_stats, stats_path
+from core.creator_store import get_creator_store
+from core.faq_index import remove_from_faq_index, update_faq_index
+from core.metrics import get_metrics, load_metrics
+from core.question_clusters import get_question_clusters
+from core.question_stats import get_question_stats
+from core.render_cache import data_version, file_version, get_chart_cache
+from core.resources import get_bedrock
+from core.rollup import run_rollup
+from core.snapshot import Snapshot, invalidate_artifact, load_csv, load_json, read_artifact
 
 # Setup page configuration
 st.set_page_config(
@@ -48,31 +57,21 @@ if "logged_in" not in st.session_state or not st.session_state.logged_in:
 # Get creator info
 username = st.session_state.current_creator
 
+# Everything read from disk during this rerun is loaded at most once
+snapshot = Snapshot()
+
 # Helper functions
 def get_creator_data():
     try:
-        df = pd.read_csv("data/creators.csv")
-        creator = df[df["username"] == username]
-        if not creator.empty:
-            return creator.iloc[0]
-        return None
+        return snapshot.get("creator", lambda: get_creator_store().get(username))
     except Exception as e:
         st.error(f"Error loading creator data: {e}")
         return None
 
 def update_creator_profile(updated_data):
     try:
-        df = pd.read_csv("data/creators.csv")
-        # Find the creator's row
-        creator_idx = df.index[df["username"] == username].tolist()[0]
-        
-        # Update fields (except username which is the identifier)
-        for key, value in updated_data.items():
-            if key != "username":
-                df.at[creator_idx, key] = value
-        
-        # Save back to file
-        df.to_csv("data/creators.csv", index=False)
+        # Update registry fields (only the creator's row; username is the key)
+        get_creator_store().update(username, updated_data)
         
         # Update profile data if exists
         profile_path = f"data/creators/{username}/profile.json"
@@ -91,6 +90,11 @@ def update_creator_profile(updated_data):
             os.makedirs(os.path.dirname(profile_path), exist_ok=True)
             with open(profile_path, "w") as f:
                 json.dump(updated_data, f, indent=4)
+        
+        # Cached answers may quote the old profile
+        get_answer_cache().invalidate(username)
+        invalidate_artifact(profile_path)
+        snapshot.invalidate("creator", "profile")
                 
         return True
     except Exception as e:
@@ -101,8 +105,7 @@ def get_creator_profile():
     try:
         profile_path = f"data/creators/{username}/profile.json"
         if os.path.exists(profile_path):
-            with open(profile_path, "r") as f:
-                return json.load(f)
+            return snapshot.get("profile", lambda: read_artifact(profile_path, load_json))
         else:
             # Create default profile
             creator_data = get_creator_data()
@@ -135,18 +138,12 @@ def get_creator_profile():
 
 def get_stats():
     try:
-        stats_path = f"data/creators/{username}/stats.csv"
-        if os.path.exists(stats_path):
-            return pd.read_csv(stats_path)
-        else:
-            # Initialize stats if doesn't exist
-            stats = pd.DataFrame({
-                "total_chats": [0],
-                "total_messages": [0],
-                "unique_users": [0]
-            })
-            stats.to_csv(stats_path, index=False)
-            return stats
+        # Push this process's buffered increments first; other processes flush on their own timer
+        get_live_counters().flush(username)
+        if not os.path.exists(stats_path(username)):
+            return pd.DataFrame([read_stats(username)])
+        return snapshot.get("stats", lambda: read_artifact(stats_path(username),
+                                                           lambda path: pd.DataFrame([read_stats(username)])))
     except Exception as e:
         st.error(f"Error loading stats: {e}")
         return pd.DataFrame({
@@ -156,35 +153,11 @@ def get_stats():
         })
 
 def get_usage_history():
-    """Generate or retrieve usage history data."""
+    """Retrieve daily usage history rolled up from the chat event log."""
     try:
-        usage_path = f"data/creators/{username}/usage_history.csv"
-        if os.path.exists(usage_path):
-            return pd.read_csv(usage_path)
-        else:
-            # Create some dummy data for now (in a real app, this would be real data)
-            today = datetime.datetime.now()
-            dates = [(today - datetime.timedelta(days=i)).strftime("%Y-%m-%d") for i in range(30, 0, -1)]
-            
-            # Generate some random usage data
-            np.random.seed(42)  # For reproducibility
-            chats = np.random.randint(0, 5, size=30)
-            messages = chats * np.random.randint(2, 8, size=30)
-            unique_users = np.random.randint(0, 3, size=30)
-            
-            # Create dataframe
-            usage_df = pd.DataFrame({
-                "date": dates,
-                "chats": chats,
-                "messages": messages,
-                "unique_users": unique_users
-            })
-            
-            # Save to file
-            os.makedirs(os.path.dirname(usage_path), exist_ok=True)
-            usage_df.to_csv(usage_path, index=False)
-            
-            return usage_df
+        # Fold in events since the last run (once per rerun); cheap when nothing is new
+        snapshot.get("rollup", lambda: run_rollup(username))
+        return get_usage_series("usage_history.csv")
     except Exception as e:
         st.error(f"Error loading usage history: {e}")
         return pd.DataFrame({
@@ -194,35 +167,45 @@ def get_usage_history():
             "unique_users": []
         })
 
-def get_most_asked_questions():
+def get_usage_series(name):
+    """Read one of the precomputed series written by the usage rollup."""
+    usage_path = f"data/creators/{username}/{name}"
+    if os.path.exists(usage_path):
+        return snapshot.get(name, lambda: read_artifact(usage_path, load_csv))
+    return pd.DataFrame()
+
+def render_chart(chart, version, draw):
+    """Show a chart from the render cache; `draw` only runs when `version` changed."""
+    st.image(get_chart_cache().render(username, chart, version, draw), use_column_width=True)
+
+def get_most_asked_questions(days=None):
     try:
-        history_path = f"data/creators/{username}/chat_history.txt"
-        if not os.path.exists(history_path):
-            return []
-        
-        with open(history_path, "r") as f:
-            content = f.read()
-        
-        # Extract user questions
-        questions = []
-        for line in content.split("\n"):
-            if line.startswith("User:"):
-                questions.append(line[5:].strip())
-        
-        # Count questions and get top 10
-        question_counts = Counter(questions)
-        return question_counts.most_common(10)
+        # Paraphrases are grouped into clusters, each shown by its most asked
+        # wording; both structures only read conversations logged since last time
+        clusters = get_question_clusters(username)
+        if days is None:
+            return [(question, count) for question, count, _ in clusters.top(10)]
+        return clusters.group(get_question_stats(username).top(None, days=days), k=10)
     except Exception as e:
         st.error(f"Error analyzing questions: {e}")
         return []
 
+def get_stage_latencies():
+    """Per-stage latency percentiles for this creator, merged across app processes."""
+    try:
+        # Write this process's spans first so its latest replies are included
+        get_metrics().flush()
+        return snapshot.get("stage_latencies", lambda: load_metrics().summary(username))
+    except Exception as e:
+        st.error(f"Error loading performance metrics: {e}")
+        return []
+
 def get_saved_faqs():
     """Get creator's saved FAQs."""
     try:
         faqs_path = f"data/creators/{username}/faqs.json"
         if os.path.exists(faqs_path):
-            with open(faqs_path, "r") as f:
-                return json.load(f)
+            return snapshot.get("faqs", lambda: read_artifact(faqs_path, load_json))
         else:
             # Initialize with empty FAQs
             default_faqs = []
@@ -252,16 +235,26 @@ def save_faq(question, answer):
                 break
         else:
             # Question doesn't exist, add it
-            faqs.append({
+            faq = {
                 "id": str(uuid.uuid4()),
                 "question": question,
                 "answer": answer,
                 "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            })
+            }
+            faqs.append(faq)
         
         # Save to file
         with open(faqs_path, "w") as f:
             json.dump(faqs, f, indent=4)
+        invalidate_artifact(faqs_path)
+        snapshot.invalidate("faqs")
+        
+        # Keep the chat page's FAQ matcher in sync (embeds only this question)
+        try:
+            update_faq_index(username, faq, get_bedrock())
+        except Exception as e:
+            # The chat page rebuilds stale entries on its next message
+            st.warning(f"FAQ saved, but the chat index will refresh later: {e}")
         
         return True
     except Exception as e:
@@ -282,6 +275,9 @@ def delete_faq(faq_id):
             # Save back to file
             with open(faqs_path, "w") as f:
                 json.dump(faqs, f, indent=4)
+            invalidate_artifact(faqs_path)
+            snapshot.invalidate("faqs")
+            remove_from_faq_index(username, faq_id)
             
             return True
     except Exception as e:
@@ -300,6 +296,8 @@ def update_bot_settings(settings):
         settings_path = f"data/creators/{username}/bot_settings.csv"
         settings_df = pd.DataFrame([settings])
         settings_df.to_csv(settings_path, index=False)
+        invalidate_artifact(settings_path)
+        snapshot.invalidate("bot_settings")
         st.success("Bot settings updated successfully!")
     except Exception as e:
         st.error(f"Error updating bot settings: {e}")
@@ -308,12 +306,13 @@ def get_bot_settings():
     try:
         settings_path = f"data/creators/{username}/bot_settings.csv"
         if os.path.exists(settings_path):
-            return pd.read_csv(settings_path).iloc[0].to_dict()
+            return snapshot.get("bot_settings", lambda: read_artifact(settings_path, load_csv).iloc[0].to_dict())
         else:
             # Default settings
+            creator_name = get_creator_data()['name']
             default_settings = {
-                "bot_name": f"{get_creator_data()['name']}'s Clone",
-                "greeting_message": f"Hi! I'm {get_creator_data()['name']}'s digital clone. How can I help you today?",
+                "bot_name": f"{creator_name}'s Clone",
+                "greeting_message": f"Hi! I'm {creator_name}'s digital clone. How can I help you today?",
                 "theme_color": "#1E88E5",
                 "avatar": "default"
             }
@@ -371,8 +370,8 @@ st.info("Share this link with your audience so they can chat with your digital c
 # st.info("Users can select your clone from the list of available creators on this page.")
 
 # Main dashboard tabs - Updated to include new sections
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-    "Profile", "Edit Profile", "Analytics", "Usage Summary", "Bot Settings", "FAQ Builder"
+tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
+    "Profile", "Edit Profile", "Analytics", "Usage Summary", "Bot Settings", "FAQ Builder", "Performance"
 ])
 
 with tab1:  # Profile Summary tab
@@ -480,59 +479,77 @@ with tab3:  # Analytics tab
         usage_data["date"] = pd.to_datetime(usage_data["date"])
         
         # Create tabs for different metrics
-        metric_tab1, metric_tab2, metric_tab3 = st.tabs(["Chats", "Messages", "Unique Users"])
+        metric_tab1, metric_tab2, metric_tab3, metric_tab4 = st.tabs(["Chats", "Messages", "Unique Users", "Response Time"])
         
-        with metric_tab1:
+        # Charts are only redrawn when the rolled-up series file changes
+        usage_version = file_version(f"data/creators/{username}/usage_history.csv")
+        
+        def draw_daily(column, title, ylabel, color):
             fig, ax = plt.subplots(figsize=(10, 5))
-            ax.plot(usage_data["date"], usage_data["chats"], marker='o', linestyle='-', color='blue')
-            ax.set_title("Daily Chats")
+            ax.plot(usage_data["date"], usage_data[column], marker='o', linestyle='-', color=color)
+            ax.set_title(title)
             ax.set_xlabel("Date")
-            ax.set_ylabel("Number of Chats")
+            ax.set_ylabel(ylabel)
             ax.grid(True, linestyle='--', alpha=0.7)
             fig.autofmt_xdate()  # Rotate date labels
-            st.pyplot(fig)
+            return fig
+        
+        with metric_tab1:
+            render_chart("daily_chats", usage_version,
+                         lambda: draw_daily("chats", "Daily Chats", "Number of Chats", 'blue'))
         
         with metric_tab2:
-            fig, ax = plt.subplots(figsize=(10, 5))
-            ax.plot(usage_data["date"], usage_data["messages"], marker='o', linestyle='-', color='green')
-            ax.set_title("Daily Messages")
-            ax.set_xlabel("Date")
-            ax.set_ylabel("Number of Messages")
-            ax.grid(True, linestyle='--', alpha=0.7)
-            fig.autofmt_xdate()
-            st.pyplot(fig)
+            render_chart("daily_messages", usage_version,
+                         lambda: draw_daily("messages", "Daily Messages", "Number of Messages", 'green'))
         
         with metric_tab3:
-            fig, ax = plt.subplots(figsize=(10, 5))
-            ax.plot(usage_data["date"], usage_data["unique_users"], marker='o', linestyle='-', color='purple')
-            ax.set_title("Daily Unique Users")
-            ax.set_xlabel("Date")
-            ax.set_ylabel("Number of Users")
-            ax.grid(True, linestyle='--', alpha=0.7)
-            fig.autofmt_xdate()
-            st.pyplot(fig)
+            render_chart("daily_users", usage_version,
+                         lambda: draw_daily("unique_users", "Daily Unique Users", "Number of Users", 'purple'))
+        
+        with metric_tab4:
+            latency_data = usage_data.dropna(subset=["latency_p50"])
+            if not latency_data.empty:
+                def draw_latency():
+                    fig, ax = plt.subplots(figsize=(10, 5))
+                    ax.plot(latency_data["date"], latency_data["latency_p50"], marker='o', linestyle='-', label='p50')
+                    ax.plot(latency_data["date"], latency_data["latency_p95"], marker='s', linestyle='-', label='p95')
+                    ax.plot(latency_data["date"], latency_data["latency_p99"], marker='^', linestyle='-', label='p99')
+                    ax.set_title("Daily Response Time")
+                    ax.set_xlabel("Date")
+                    ax.set_ylabel("Seconds")
+                    ax.legend()
+                    ax.grid(True, linestyle='--', alpha=0.7)
+                    fig.autofmt_xdate()
+                    return fig
+                render_chart("daily_latency", usage_version, draw_latency)
+            else:
+                st.info("No response times recorded yet.")
     
     # Most asked questions
     st.subheader("Most Asked Questions")
-    most_asked = get_most_asked_questions()
+    question_window = st.radio("Period", ["All time", "Last 30 days", "Last 7 days"], horizontal=True,
+                               key="question_window")
+    most_asked = get_most_asked_questions({"All time": None, "Last 30 days": 30, "Last 7 days": 7}[question_window])
     
     if most_asked:
         # Create a DataFrame for the questions
         questions_df = pd.DataFrame(most_asked, columns=["Question", "Count"])
         
         # Display as a bar chart
-        fig, ax = plt.subplots(figsize=(10, 6))
-        bars = ax.barh(questions_df["Question"].str.slice(0, 30), questions_df["Count"], color='skyblue')
-        ax.set_title("Top Questions")
-        ax.set_xlabel("Count")
+        def draw_top_questions():
+            fig, ax = plt.subplots(figsize=(10, 6))
+            bars = ax.barh(questions_df["Question"].str.slice(0, 30), questions_df["Count"], color='skyblue')
+            ax.set_title("Top Questions")
+            ax.set_xlabel("Count")
+            
+            # Add count labels to bars
+            for bar in bars:
+                width = bar.get_width()
+                ax.text(width + 0.1, bar.get_y() + bar.get_height()/2, f"{width:.0f}", 
+                        ha='left', va='center')
+            return fig
         
-        # Add count labels to bars
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width + 0.1, bar.get_y() + bar.get_height()/2, f"{width:.0f}", 
-                    ha='left', va='center')
-        
-        st.pyplot(fig)
+        render_chart(f"top_questions_{question_window}", data_version(most_asked), draw_top_questions)
         
         # Also display as a table
         st.write("### Top Questions Details")
@@ -570,37 +587,69 @@ with tab4:  # Usage Summary tab
                 st.metric("Total Messages", total_messages)
             
             with col3:
-                total_users = month_data["unique_users"].sum()
+                # Monthly uniques come from merged daily HyperLogLogs, so a
+                # visitor who returns on several days is counted once
+                monthly_data = get_usage_series("usage_monthly.csv")
+                monthly_data = monthly_data[monthly_data["month"] == current_month] if not monthly_data.empty else monthly_data
+                total_users = int(monthly_data["unique_users"].sum()) if not monthly_data.empty else 0
                 st.metric("Total Users Served", total_users)
             
             # Weekly trends
             st.subheader("Weekly Trends")
             
-            # Group by week
-            usage_data["week"] = pd.to_datetime(usage_data["date"]).dt.isocalendar().week
-            weekly_data = usage_data.groupby("week").sum().reset_index()
-            
-            # Plot weekly data
-            fig, ax = plt.subplots(figsize=(10, 5))
-            ax.plot(weekly_data["week"], weekly_data["chats"], marker='o', label='Chats')
-            ax.plot(weekly_data["week"], weekly_data["messages"], marker='s', label='Messages')
-            ax.plot(weekly_data["week"], weekly_data["unique_users"], marker='^', label='Users')
+            weekly_data = get_usage_series("usage_weekly.csv").tail(12)
             
-            ax.set_title("Weekly Usage Trends")
-            ax.set_xlabel("Week of Year")
-            ax.set_ylabel("Count")
-            ax.legend()
-            ax.grid(True, linestyle='--', alpha=0.7)
+            if not weekly_data.empty:
+                # Plot weekly data
+                def draw_weekly():
+                    fig, ax = plt.subplots(figsize=(10, 5))
+                    ax.plot(weekly_data["week"], weekly_data["chats"], marker='o', label='Chats')
+                    ax.plot(weekly_data["week"], weekly_data["messages"], marker='s', label='Messages')
+                    ax.plot(weekly_data["week"], weekly_data["unique_users"], marker='^', label='Users')
+                
+                    ax.set_title("Weekly Usage Trends")
+                    ax.set_xlabel("Week of Year")
+                    ax.set_ylabel("Count")
+                    ax.legend()
+                    ax.grid(True, linestyle='--', alpha=0.7)
+                    return fig
             
-            st.pyplot(fig)
+                render_chart("weekly_usage", file_version(f"data/creators/{username}/usage_weekly.csv"), draw_weekly)
+            else:
+                st.info("Not enough conversations yet to show weekly trends.")
             
             # Hours of operation
             st.subheader("Hours of Operation")
-            st.info("This feature will show the most active hours for your clone based on user interactions. Data is not yet available.")
+            hours_data = get_usage_series("usage_hours.csv")
+            if not hours_data.empty and hours_data["messages"].sum() > 0:
+                def draw_hours():
+                    fig, ax = plt.subplots(figsize=(10, 4))
+                    ax.bar(hours_data["hour"], hours_data["messages"], color='orange')
+                    ax.set_title("Messages by Hour of Day (last 30 days)")
+                    ax.set_xlabel("Hour")
+                    ax.set_ylabel("Messages")
+                    ax.set_xticks(range(24))
+                    ax.grid(True, axis='y', linestyle='--', alpha=0.7)
+                    return fig
+                render_chart("hours", file_version(f"data/creators/{username}/usage_hours.csv"), draw_hours)
+            else:
+                st.info("Not enough conversations yet to show your clone's most active hours.")
             
             # User retention
             st.subheader("User Retention")
-            st.info("This feature will show how many users return to chat with your clone. Data is not yet available.")
+            retention_data = get_usage_series("usage_retention.csv")
+            if not retention_data.empty and retention_data["chats"].iloc[0] > 0:
+                def draw_retention():
+                    fig, ax = plt.subplots(figsize=(10, 4))
+                    ax.bar(retention_data["turn"].astype(str), retention_data["share"] * 100, color='teal')
+                    ax.set_title("Share of Chats Reaching Each Turn")
+                    ax.set_xlabel("Turn")
+                    ax.set_ylabel("% of Chats")
+                    ax.grid(True, axis='y', linestyle='--', alpha=0.7)
+                    return fig
+                render_chart("retention", file_version(f"data/creators/{username}/usage_retention.csv"), draw_retention)
+            else:
+                st.info("Not enough conversations yet to show how long visitors keep chatting.")
         else:
             st.info("No data available for the current month.")
     else:
@@ -743,4 +792,43 @@ with tab6:  # FAQ Builder tab
                     st.success("Sample FAQ added successfully! Edit it to add your custom answer.")
                     st.rerun()
             st.write(f"**{faq['question']}**")
-            st.write("---") 
\ No newline at end of file
+            st.write("---") 
+
+with tab7:  # Performance tab
+    st.header("Performance")
+    st.write("Where the time goes when your clone answers, per stage of the reply pipeline "
+             "(all replies since each app process started; processes that stopped count "
+             "for a day after they stop).")
+    
+    stage_rows = get_stage_latencies()
+    if stage_rows:
+        latency_df = pd.DataFrame(stage_rows)
+        
+        # Stage percentiles in milliseconds
+        display_df = latency_df.copy()
+        for column in ["p50", "p95", "p99", "mean"]:
+            display_df[column] = (display_df[column] * 1000).round(1)
+        display_df.columns = ["Stage", "Count", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Mean (ms)"]
+        st.dataframe(display_df, hide_index=True, use_container_width=True)
+        
+        # Pipeline stages only; ttft and total span the whole reply
+        chart_df = latency_df[~latency_df["stage"].isin(["ttft", "total"])]
+        
+        def draw_stages():
+            fig, ax = plt.subplots(figsize=(10, 5))
+            positions = range(len(chart_df))
+            ax.barh([p - 0.2 for p in positions], chart_df["p50"] * 1000, height=0.4, label='p50', color='steelblue')
+            ax.barh([p + 0.2 for p in positions], chart_df["p95"] * 1000, height=0.4, label='p95', color='salmon')
+            ax.set_yticks(positions)
+            ax.set_yticklabels(chart_df["stage"])
+            ax.invert_yaxis()
+            ax.set_title("Stage Latency")
+            ax.set_xlabel("Milliseconds")
+            ax.legend()
+            ax.grid(True, axis='x', linestyle='--', alpha=0.7)
+            return fig
+        
+        if not chart_df.empty:
+            render_chart("stage_latency", data_version(stage_rows), draw_stages)
+    else:
+        st.info("No replies timed yet. Stage timings appear here once visitors chat with your clone.")
@@ -0,0 +1,60 @@
+"""Admission slots are released on every path out of a generation."""
+import threading
+
+import pytest
+from botocore.exceptions import ClientError
+
+from core import chat_pipeline
+from core.admission import ADMISSION_SHED_MESSAGE, AdmissionController
+from core.fakes import FakeBedrock, FakeLLM, FakeVectorStore
+
+
+@pytest.fixture
+def controller(tmp_path, monkeypatch):
+    # Caches and indexes use relative data/ paths
+    monkeypatch.chdir(tmp_path)
+    controller = AdmissionController(max_concurrency=4, creator_concurrency=2, max_wait=0.5)
+    monkeypatch.setattr(chat_pipeline, "get_admission_controller", lambda: controller)
+    return controller
+
+
+def ask(question, llm):
+    session = {}
+    tokens = list(chat_pipeline.call_langchain_with_chat_memory(
+        [], question, "creator", session, bedrock=FakeBedrock(), vector_store=FakeVectorStore(), llm=llm
+    ))
+    return "".join(tokens)
+
+
+def test_failed_stream_start_releases_slot(controller):
+    throttled = FakeLLM(rate=1e-9)  # every call raises ThrottlingException
+    for question in ("first question", "second question", "third question"):
+        with pytest.raises(ClientError):
+            ask(question, throttled)
+    assert controller.stats()["running"] == 0
+
+    answer = ask("fourth question", FakeLLM(tokens=3))
+    assert answer and answer != ADMISSION_SHED_MESSAGE
+    assert controller.stats() == {"running": 0, "queued": 0, "admitted": 4, "shed": 0}
+
+
+def test_interrupted_wait_releases_ticket():
+    controller = AdmissionController(max_concurrency=1, max_wait=2)
+    held = controller.acquire("a", 1)
+
+    def interrupt(position):
+        raise KeyboardInterrupt("rerun")
+
+    def waiter():
+        with pytest.raises(KeyboardInterrupt):
+            controller.acquire("a", 1, on_wait=interrupt)
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    thread.join()
+    controller.release(held)
+    assert controller.stats()["running"] == 0
+
+    ticket = controller.acquire("b", 1)
+    assert ticket.admitted
+    controller.release(ticket)